@@ -1,12 +1,15 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import os
+import hashlib
 from dotenv import load_dotenv
 from supabase import Client
 from database import supabase
 from typing import Optional
 import jwt
-from datetime import datetime, timedelta
+from cachetools import TTLCache
+from datetime import timedelta
+import time
 
 # Load environment variables
 load_dotenv()
@@ -14,28 +17,83 @@ load_dotenv()
 # Security scheme for API endpoints
 security = HTTPBearer()
 
+# Supabase signs access tokens either with the project's shared JWT secret (HS256)
+# or with asymmetric keys published as a JWKS. Either way tokens are verified
+# locally, without a round-trip to Supabase Auth per request.
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+JWT_AUDIENCE = "authenticated"
+
+# PyJWKClient caches the key set (10 minutes) and refetches when it sees an unknown kid
+_jwks_client = (
+    jwt.PyJWKClient(
+        f"{SUPABASE_URL}/auth/v1/.well-known/jwks.json", cache_keys=True, lifespan=600
+    )
+    if SUPABASE_URL and not SUPABASE_JWT_SECRET
+    else None
+)
+
+# Verified claims for recently seen tokens, so bursts of requests skip re-verification
+_verified_tokens: TTLCache = TTLCache(maxsize=4096, ttl=5)
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid authentication credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def _verify_token(token: str) -> dict:
+    """
+    Verify a Supabase access token locally and return its claims.
+    """
+    if SUPABASE_JWT_SECRET:
+        return jwt.decode(
+            token, SUPABASE_JWT_SECRET, algorithms=["HS256"], audience=JWT_AUDIENCE
+        )
+
+    signing_key = _jwks_client.get_signing_key_from_jwt(token)
+    # The algorithm comes from the published key, never from the token's own header,
+    # so a token claiming HS256 or "none" is rejected as invalid
+    return jwt.decode(
+        token,
+        signing_key.key,
+        algorithms=[signing_key.algorithm_name],
+        audience=JWT_AUDIENCE,
+    )
+
+
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Optional[dict]:
     """
     Get the current authenticated user from the JWT token.
-    In a real implementation, this would verify the token with Supabase Auth.
+    The token is verified locally against the Supabase JWT secret or JWKS.
+
+    Not wired into main.py yet: its endpoints still depend on the placeholder
+    there, since the frontend does not send access tokens.
     """
     token = credentials.credentials
-    
-    # In a real implementation, we would verify the token with Supabase Auth
-    # For now, we'll implement a simple mock authentication
-    try:
-        # This is a placeholder - in a real app, you'd verify the token with Supabase
-        # decoded_token = supabase.auth.get_user(token)
-        # return decoded_token.user
-        
-        # For now, return a mock user
+
+    if not SUPABASE_JWT_SECRET and _jwks_client is None:
+        # Auth is not configured (local development) - fall back to a mock user
         return {"id": "mock_user_id", "email": "user@example.com", "role": "admin"}
-    except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+
+    token_key = hashlib.sha256(token.encode()).digest()
+    claims = _verified_tokens.get(token_key)
+    if claims is None:
+        try:
+            claims = _verify_token(token)
+        except (jwt.InvalidTokenError, jwt.PyJWKClientError):
+            # InvalidTokenError also covers ExpiredSignatureError
+            raise _credentials_exception()
+        _verified_tokens[token_key] = claims
+
+    return {
+        "id": claims.get("sub"),
+        "email": claims.get("email"),
+        "role": claims.get("role"),
+    }
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -44,15 +102,13 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     In a real implementation, this would be handled by Supabase Auth.
     """
     to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    
+    expires_delta = expires_delta or timedelta(minutes=15)
+    # JWT "exp" is an integer NumericDate (seconds since the epoch, UTC)
+    to_encode.update({"exp": time.time_ns() // 10**9 + int(expires_delta.total_seconds())})
+
     # In a real implementation, Supabase would handle token creation
     # encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     # return encoded_jwt
-    
+
     # For now, return the data as a mock token
     return {"access_token": "mock_token", "token_type": "bearer", **to_encode}
@@ -0,0 +1,162 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import asyncio
+import logging
+import threading
+from genai_client import call_gemini, get_genai
+
+logger = logging.getLogger(__name__)
+
+# Smallest system instruction (in tokens) Gemini accepts as explicit cached content
+MIN_CACHED_TOKENS = {"gemini-2.5-flash": 1024, "gemini-2.5-pro": 4096}
+DEFAULT_MIN_CACHED_TOKENS = 4096
+
+
+class CachedPromptModel:
+    """
+    Wraps a Gemini model whose large, fixed system instruction is stored once as
+    explicit cached content, so each request only transmits the variable user prompt.
+
+    The cache is created lazily on first use and recreated when it expires or is
+    evicted server-side. Instructions below the model's minimum cacheable size are
+    detected up front (a character count, then one count_tokens call) and never
+    attempt cache creation. If the cache cannot be created, requests fall back to a
+    regular model carrying the same system instruction.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        system_instruction: str,
+        ttl: timedelta = timedelta(hours=1),
+        display_name: Optional[str] = None,
+    ):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.ttl = ttl
+        self.display_name = display_name
+        self._lock = threading.Lock()
+        self._cache = None
+        self._cached_model = None
+        self._expires_at: Optional[datetime] = None
+        self._retry_after: Optional[datetime] = None
+        # None until the instruction's size has been checked against the minimum
+        self._cacheable: Optional[bool] = None
+        # Plain model built once and reused whenever the context cache is unavailable
+        self._fallback_model = get_genai().GenerativeModel(
+            model_name, system_instruction=system_instruction
+        )
+
+    def _is_cacheable(self) -> bool:
+        """
+        Whether the system instruction reaches the model's minimum cacheable size.
+        A token spans at least one character, so shorter instructions are rejected
+        without a count_tokens call. Called with the lock held.
+        """
+        if self._cacheable is None:
+            minimum = MIN_CACHED_TOKENS.get(self.model_name, DEFAULT_MIN_CACHED_TOKENS)
+            if len(self.system_instruction) < minimum:
+                self._cacheable = False
+            else:
+                tokens = get_genai().GenerativeModel(self.model_name).count_tokens(
+                    self.system_instruction
+                ).total_tokens
+                self._cacheable = tokens >= minimum
+            if not self._cacheable:
+                logger.info(
+                    "%s instruction is below the %d-token cache minimum, using the uncached model",
+                    self.display_name,
+                    minimum,
+                )
+        return self._cacheable
+
+    def _get_model(self):
+        with self._lock:
+            now = datetime.now(timezone.utc)
+            # Refresh slightly before the server-side TTL runs out
+            if self._cached_model is not None and now < self._expires_at - timedelta(minutes=1):
+                return self._cached_model
+            # Don't retry cache creation on every request after a failure
+            if self._retry_after is not None and now < self._retry_after:
+                return self._fallback_model
+
+            genai = get_genai()
+            try:
+                if not self._is_cacheable():
+                    return self._fallback_model
+                self._cache = genai.caching.CachedContent.create(
+                    model=f"models/{self.model_name}",
+                    display_name=self.display_name,
+                    system_instruction=self.system_instruction,
+                    ttl=self.ttl,
+                )
+                self._cached_model = genai.GenerativeModel.from_cached_content(
+                    cached_content=self._cache
+                )
+                self._expires_at = now + self.ttl
+                return self._cached_model
+            except Exception as e:
+                logger.warning("Context cache unavailable for %s: %s", self.display_name, e)
+                self._cache = None
+                self._cached_model = None
+                self._retry_after = now + self.ttl
+
+            return self._fallback_model
+
+    def invalidate(self):
+        """
+        Drop the current cache so the next request recreates it.
+        """
+        with self._lock:
+            self._cache = None
+            self._cached_model = None
+            self._expires_at = None
+
+    def _log_usage(self, response):
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            logger.debug(
+                "%s cached tokens: %s",
+                self.display_name,
+                getattr(usage, "cached_content_token_count", 0),
+            )
+
+    @staticmethod
+    def _cache_missing_errors():
+        from google.api_core import exceptions as google_exceptions
+
+        return (google_exceptions.NotFound, google_exceptions.PermissionDenied)
+
+    def generate_content(self, contents, **kwargs):
+        """
+        Generate content with only the per-request contents; the system instruction
+        is supplied by the cache. Retries once if the cache has expired server-side.
+        """
+        model = self._get_model()
+        try:
+            response = model.generate_content(contents, **kwargs)
+        except self._cache_missing_errors() as e:
+            logger.info("Context cache expired for %s, recreating: %s", self.display_name, e)
+            self.invalidate()
+            response = self._get_model().generate_content(contents, **kwargs)
+
+        self._log_usage(response)
+        return response
+
+    async def generate_content_async(self, contents, **kwargs):
+        """
+        Async variant of generate_content. Cache (re)creation is a blocking call,
+        so model lookup runs in a worker thread; the request itself counts against
+        the shared Gemini concurrency cap.
+        """
+        model = await asyncio.to_thread(self._get_model)
+        try:
+            response = await call_gemini(model.generate_content_async, contents, **kwargs)
+        except self._cache_missing_errors() as e:
+            logger.info("Context cache expired for %s, recreating: %s", self.display_name, e)
+            self.invalidate()
+            model = await asyncio.to_thread(self._get_model)
+            response = await call_gemini(model.generate_content_async, contents, **kwargs)
+
+        self._log_usage(response)
+        return response
@@ -0,0 +1,46 @@
+from typing import Generic, Iterator, Optional, Type, TypeVar
+import os
+import tempfile
+from diskcache import Cache
+from dotenv import load_dotenv
+from pydantic import BaseModel
+
+# Load environment variables
+load_dotenv()
+
+# Shared by every uvicorn worker on the host; override with AEGIS_CACHE_DIR
+CACHE_DIR = os.getenv("AEGIS_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "aegis-cache")
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+class DiskModelStore(Generic[ModelT]):
+    """
+    Dict-like store of Pydantic models backed by diskcache (SQLite in WAL mode).
+
+    Unlike an in-process dict, entries are visible to every worker process on the
+    host and survive restarts. Least-recently-used entries are evicted once the
+    store grows past size_limit bytes.
+    """
+
+    def __init__(self, name: str, model: Type[ModelT], size_limit: int = 256 * 2**20):
+        self.model = model
+        self._cache = Cache(
+            os.path.join(CACHE_DIR, name),
+            size_limit=size_limit,
+            eviction_policy="least-recently-used",
+        )
+
+    def __setitem__(self, key: str, value: ModelT):
+        self._cache.set(key, value.model_dump_json())
+
+    def get(self, key: str) -> Optional[ModelT]:
+        data = self._cache.get(key)
+        return self.model.model_validate_json(data) if data is not None else None
+
+    def values(self) -> Iterator[ModelT]:
+        for key in self._cache.iterkeys():
+            value = self.get(key)
+            # Another worker may have evicted the key since iteration started
+            if value is not None:
+                yield value
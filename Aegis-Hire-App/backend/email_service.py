@@ -1,27 +1,141 @@
 import smtplib
+from contextlib import contextmanager
 from email.mime.text import MIMEText
 from pydantic import BaseModel
+from queue import Empty, Full, LifoQueue
+from typing import Dict
+import atexit
 import os
+import threading
+import time
+
+# Pool defaults: at most 5 idle connections, each retired after 100 messages
+# (most providers cap how many messages may be sent over one SMTP session)
+MAX_POOL_CONNECTIONS = 5
+MAX_MESSAGES_PER_CONNECTION = 100
+
+# Background delivery retries: 3 attempts with 2s, 4s backoff between them
+SEND_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = 2
+
 
 class EmailRequest(BaseModel):
     to_email: str
     subject: str
     body: str
 
+
+class SMTPPool:
+    """
+    Small pool of logged-in SMTP connections so concurrent senders don't
+    serialize on one session and steady-state sends skip the TLS + AUTH handshake.
+    """
+
+    def __init__(self, server: str, port: int, user: str, password: str,
+                 max_idle: int = MAX_POOL_CONNECTIONS,
+                 max_messages: int = MAX_MESSAGES_PER_CONNECTION):
+        self.server = server
+        self.port = port
+        self.user = user
+        self.password = password
+        self.max_messages = max_messages
+        # LIFO so the most recently used (warmest) connection is reused first
+        self._idle: LifoQueue = LifoQueue(maxsize=max_idle)
+        self._msgs_on: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def _connect(self) -> smtplib.SMTP:
+        conn = smtplib.SMTP(self.server, self.port, timeout=30)
+        conn.ehlo()
+        conn.starttls()
+        conn.ehlo()
+        conn.login(self.user, self.password)
+        return conn
+
+    @staticmethod
+    def _is_alive(conn: smtplib.SMTP) -> bool:
+        try:
+            return conn.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _discard(self, conn: smtplib.SMTP):
+        with self._lock:
+            self._msgs_on.pop(id(conn), None)
+        try:
+            conn.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+
+    def _acquire(self) -> smtplib.SMTP:
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except Empty:
+                conn = self._connect()
+                with self._lock:
+                    self._msgs_on[id(conn)] = 0
+                return conn
+            if self._is_alive(conn):
+                return conn
+            self._discard(conn)
+
+    def _release(self, conn: smtplib.SMTP, broken: bool = False):
+        with self._lock:
+            sent = self._msgs_on.get(id(conn), 0) + (0 if broken else 1)
+            self._msgs_on[id(conn)] = sent
+        if broken or sent >= self.max_messages:
+            self._discard(conn)
+            return
+        try:
+            self._idle.put_nowait(conn)
+        except Full:
+            self._discard(conn)
+
+    @contextmanager
+    def acquire(self):
+        """
+        Check out a connection for the duration of the block, returning it to the
+        pool afterwards (or discarding it if the send failed).
+        """
+        conn = self._acquire()
+        try:
+            yield conn
+        except Exception:
+            self._release(conn, broken=True)
+            raise
+        self._release(conn)
+
+    def close(self):
+        """
+        Close all idle connections.
+        """
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except Empty:
+                return
+
+
 class EmailService:
     def __init__(self):
-        self.smtp_server = os.getenv("SMTP_SERVER")
+        self.smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
         self.smtp_port = int(os.getenv("SMTP_PORT", 587))
         self.smtp_user = os.getenv("SMTP_USER")
         self.smtp_password = os.getenv("SMTP_PASSWORD")
 
+        self._pool = SMTPPool(
+            self.smtp_server, self.smtp_port, self.smtp_user, self.smtp_password
+        )
+        atexit.register(self._pool.close)
+
     def send_email(self, request: EmailRequest):
         """
         Sends an email using the configured SMTP server.
         """
-        if not all([self.smtp_server, self.smtp_port, self.smtp_user, self.smtp_password]):
+        if not self.is_configured():
             print("Email service is not configured. Please check your .env file.")
-            return {"message": "Email service is not configured."}
+            return {"success": False, "message": "Email service is not configured."}
 
         msg = MIMEText(request.body)
         msg['Subject'] = request.subject
@@ -29,13 +143,36 @@ class EmailService:
         msg['To'] = request.to_email
 
         try:
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_user, self.smtp_password)
-                server.send_message(msg)
-            return {"message": f"Email successfully sent to {request.to_email}"}
+            try:
+                with self._pool.acquire() as conn:
+                    conn.send_message(msg)
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError):
+                # The server dropped the session mid-send; retry once on a fresh connection
+                with self._pool.acquire() as conn:
+                    conn.send_message(msg)
+            return {"success": True, "message": f"Email successfully sent to {request.to_email}"}
         except Exception as e:
             print(f"Failed to send email: {e}")
-            return {"message": f"Failed to send email: {e}"}
+            return {"success": False, "message": f"Failed to send email: {e}"}
+
+    def is_configured(self) -> bool:
+        return all([self.smtp_server, self.smtp_port, self.smtp_user, self.smtp_password])
+
+    def send_email_with_retry(self, request: EmailRequest, attempts: int = SEND_ATTEMPTS):
+        """
+        Sends an email, retrying with exponential backoff. Intended to run as a
+        background task, so the sleeps never hold up an HTTP response.
+        """
+        result = {"success": False, "message": "Email was not sent."}
+        for attempt in range(1, attempts + 1):
+            result = self.send_email(request)
+            if result["success"] or not self.is_configured():
+                return result
+            if attempt < attempts:
+                delay = RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)
+                print(f"Retrying email to {request.to_email} in {delay}s (attempt {attempt}/{attempts})")
+                time.sleep(delay)
+        print(f"Giving up on email to {request.to_email}: {result['message']}")
+        return result
 
 email_service = EmailService()
@@ -0,0 +1,114 @@
+from contextlib import asynccontextmanager
+from functools import lru_cache
+import asyncio
+import logging
+import os
+import random
+import time
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+# The single Gemini API key for the process. genai.configure mutates global SDK
+# state, so it must only ever be called here, never from individual services.
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
+
+# Process-wide cap on in-flight Gemini requests, so bursts queue here instead of
+# coming back from the API as 429s
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+GEMINI_MAX_RETRIES = 3
+_gemini_slots = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+
+# Optional requests-per-minute quota to pace calls against (e.g. the project's
+# Gemini RPM limit); unset or 0 disables pacing
+GEMINI_REQUESTS_PER_MINUTE = int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "0"))
+
+
+class RateLimiter:
+    """
+    Async token bucket: allows bursts of up to `rate` requests, refilled
+    continuously at `rate` per `period` seconds.
+    """
+
+    def __init__(self, rate: int, period: float = 60.0):
+        self.rate = rate
+        self.period = period
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        # Waiters queue on the lock, so tokens are handed out in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.rate, self._tokens + (now - self._updated) * self.rate / self.period
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) * self.period / self.rate)
+
+
+_gemini_rate = RateLimiter(GEMINI_REQUESTS_PER_MINUTE) if GEMINI_REQUESTS_PER_MINUTE > 0 else None
+
+
+@asynccontextmanager
+async def gemini_slot():
+    """
+    Hold one of the process-wide Gemini request slots (after an RPM token, when
+    pacing is configured). For calls that can't go through call_gemini, such as a
+    LangChain stream, which keeps its slot until it has been consumed.
+    """
+    if _gemini_rate is not None:
+        await _gemini_rate.acquire()
+    async with _gemini_slots:
+        yield
+
+
+@lru_cache(maxsize=1)
+def get_genai():
+    """
+    Import and configure the Gemini SDK on first use.
+
+    google.generativeai pulls in gRPC and protobuf, so deferring the import keeps
+    process start-up (and serverless cold starts) fast until an LLM call is made.
+    """
+    import google.generativeai as genai
+
+    if GEMINI_API_KEY:
+        genai.configure(api_key=GEMINI_API_KEY)
+    return genai
+
+
+async def call_gemini(call, *args, **kwargs):
+    """
+    Run a Gemini SDK call under the process-wide concurrency cap (and RPM pacing,
+    when configured), retrying with jittered exponential backoff (~1s, 2s, 4s)
+    when the API reports it is rate limited or temporarily unavailable.
+
+    Coroutine functions (e.g. generate_content_async) are awaited directly;
+    blocking calls run in the default thread pool so they never stall the event loop.
+    """
+    from google.api_core.exceptions import ResourceExhausted, ServiceUnavailable
+
+    for attempt in range(GEMINI_MAX_RETRIES + 1):
+        async with gemini_slot():
+            try:
+                if asyncio.iscoroutinefunction(call):
+                    return await call(*args, **kwargs)
+                return await asyncio.to_thread(call, *args, **kwargs)
+            except (ResourceExhausted, ServiceUnavailable) as e:
+                if attempt == GEMINI_MAX_RETRIES:
+                    raise
+                logger.warning("Gemini call failed (%s), retrying", type(e).__name__)
+        # Back off outside the semaphore so waiting requests can use the slot. Jitter
+        # keeps sessions that were throttled together from retrying in lockstep.
+        delay = 2**attempt + random.uniform(0, 1)
+        await asyncio.sleep(delay)
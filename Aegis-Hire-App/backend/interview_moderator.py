@@ -1,48 +1,189 @@
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from langchain_google_genai import ChatGoogleGenerativeAI
+import asyncio
+import hashlib
+from typing import AsyncIterator, Optional
+from pydantic import BaseModel
+from cachetools import TTLCache
+from response_cache import ExactLLMCache
+from genai_client import call_gemini, gemini_slot
+
+# Minimum transcript growth (in characters) before an interview gets fresh feedback
+MIN_TRANSCRIPT_GROWTH = 200
+
+# Prompt template for generating interview feedback
+MODERATOR_PROMPT_TEMPLATE = """
+As an interview moderator, your role is to analyze the provided interview transcript and offer real-time feedback to the interviewer. This feedback should help the interviewer conduct a more effective and fair interview.
+
+Here is the current transcript of the interview:
+---
+{transcript}
+---
+
+Based on the transcript, please provide concise and actionable feedback for the interviewer. Focus on the following areas:
+
+1.  **Question Quality**: Are the questions open-ended, relevant to the job description, and effective at assessing the candidate's skills and experience?
+2.  **Bias and Fairness**: Is the interviewer asking questions that could be perceived as biased or discriminatory? Are they giving the candidate enough time to speak?
+3.  **Rapport and Engagement**: Is the interviewer building a good rapport with the candidate? Is the conversation engaging and professional?
+4.  **Topic Coverage**: Are all the key areas of the job description being covered? Are there any important topics that have been missed?
+
+Your feedback should be presented as a list of suggestions or observations that the interviewer can use to improve their technique during the interview.
+"""
+
+
+class FeedbackRequest(BaseModel):
+    transcript: str
+    interview_id: Optional[str] = None
 
 
 class InterviewModerator:
     def __init__(self):
-        # Initialize the language model
-        self.llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0.7)
+        # The LangChain chain is built on first use (see the chain property) so that
+        # importing this module does not pull in langchain / Gemini client libraries.
+        self._chain = None
 
-        # Define the prompt template for generating interview feedback
-        self.prompt_template = PromptTemplate(
-            input_variables=["transcript"],
-            template="""
-            As an interview moderator, your role is to analyze the provided interview transcript and offer real-time feedback to the interviewer. This feedback should help the interviewer conduct a more effective and fair interview.
+        # Reuse feedback when the same transcript is polled again. Keyed on the whole
+        # transcript: any growth, even within an unfinished sentence, gets new feedback.
+        self.response_cache = ExactLLMCache()
 
-            Here is the current transcript of the interview:
-            ---
-            {transcript}
-            ---
+        # interview_id -> (transcript length, transcript hash, feedback) of the last call.
+        # Bounded like the live interview sessions so finished interviews are dropped.
+        self._session_state: TTLCache = TTLCache(maxsize=10_000, ttl=3600)
 
-            Based on the transcript, please provide concise and actionable feedback for the interviewer. Focus on the following areas:
+    @property
+    def chain(self):
+        """
+        The prompt | LLM | parser chain, created on first access.
+        """
+        if self._chain is None:
+            from langchain_core.prompts import PromptTemplate
+            from langchain_core.output_parsers import StrOutputParser
+            from langchain_google_genai import ChatGoogleGenerativeAI
 
-            1.  **Question Quality**: Are the questions open-ended, relevant to the job description, and effective at assessing the candidate's skills and experience?
-            2.  **Bias and Fairness**: Is the interviewer asking questions that could be perceived as biased or discriminatory? Are they giving the candidate enough time to speak?
-            3.  **Rapport and Engagement**: Is the interviewer building a good rapport with the candidate? Is the conversation engaging and professional?
-            4.  **Topic Coverage**: Are all the key areas of the job description being covered? Are there any important topics that have been missed?
+            # Initialize the language model
+            llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0.7)
+            prompt_template = PromptTemplate(
+                input_variables=["transcript"], template=MODERATOR_PROMPT_TEMPLATE
+            )
+            # Create the processing chain
+            self._chain = prompt_template | llm | StrOutputParser()
+        return self._chain
 
-            Your feedback should be presented as a list of suggestions or observations that the interviewer can use to improve their technique during the interview.
-            """,
-        )
+    async def _get_chain(self):
+        """
+        The chain for async callers. The first build imports LangChain and creates the
+        Gemini client, which blocks, so it runs in a worker thread.
+        """
+        if self._chain is None:
+            return await asyncio.to_thread(lambda: self.chain)
+        return self._chain
+
+    def _recent_feedback(self, interview_id: Optional[str], transcript: str) -> Optional[str]:
+        """
+        Return the last feedback for this interview if the transcript has only been
+        extended by a little since it was generated.
+        """
+        if interview_id is None or interview_id not in self._session_state:
+            return None
+        prev_length, prev_hash, prev_feedback = self._session_state[interview_id]
+        if len(transcript) - prev_length >= MIN_TRANSCRIPT_GROWTH:
+            return None
+        if hashlib.sha256(transcript[:prev_length].encode()).digest() != prev_hash:
+            return None
+        return prev_feedback
 
-        # Create the processing chain
-        self.chain = self.prompt_template | self.llm | StrOutputParser()
+    def _remember_feedback(self, interview_id: Optional[str], transcript: str, feedback: str):
+        if interview_id is not None:
+            self._session_state[interview_id] = (
+                len(transcript),
+                hashlib.sha256(transcript.encode()).digest(),
+                feedback,
+            )
 
-    def generate_feedback(self, transcript: str) -> str:
+    def generate_feedback(self, transcript: str, interview_id: Optional[str] = None) -> str:
         """
         Generates feedback on the interview transcript.
 
         Args:
             transcript: The transcript of the interview.
+            interview_id: Optional interview identifier. When given, polls that add
+                little new transcript reuse the previous feedback.
 
         Returns:
             A string containing feedback for the interviewer.
         """
+        recent = self._recent_feedback(interview_id, transcript)
+        if recent is not None:
+            return recent
+
+        cached = self.response_cache.lookup(transcript, interview_id or "")
+        if cached is not None:
+            self._remember_feedback(interview_id, transcript, cached)
+            return cached
+
         # Invoke the chain with the transcript
         feedback = self.chain.invoke({"transcript": transcript})
+        self.response_cache.put(transcript, feedback, interview_id or "")
+        self._remember_feedback(interview_id, transcript, feedback)
         return feedback
+
+    async def agenerate_feedback(
+        self, transcript: str, interview_id: Optional[str] = None
+    ) -> str:
+        """
+        Async variant of generate_feedback that does not block the event loop
+        during the LLM round-trip.
+
+        Args:
+            transcript: The transcript of the interview.
+            interview_id: Optional interview identifier. When given, polls that add
+                little new transcript reuse the previous feedback.
+
+        Returns:
+            A string containing feedback for the interviewer.
+        """
+        recent = self._recent_feedback(interview_id, transcript)
+        if recent is not None:
+            return recent
+
+        cached = self.response_cache.lookup(transcript, interview_id or "")
+        if cached is not None:
+            self._remember_feedback(interview_id, transcript, cached)
+            return cached
+
+        chain = await self._get_chain()
+        # Counted against the shared Gemini concurrency cap and RPM pacing like
+        # every other Gemini call
+        feedback = await call_gemini(chain.ainvoke, {"transcript": transcript})
+        self.response_cache.put(transcript, feedback, interview_id or "")
+        self._remember_feedback(interview_id, transcript, feedback)
+        return feedback
+
+    async def stream_feedback(
+        self, transcript: str, interview_id: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Streams feedback on the interview transcript as the model generates it.
+
+        Args:
+            transcript: The transcript of the interview.
+            interview_id: Optional interview identifier, scoping the cached feedback
+                to that interview.
+
+        Yields:
+            Text deltas of the feedback for the interviewer.
+        """
+        cached = self.response_cache.lookup(transcript, interview_id or "")
+        if cached is not None:
+            self._remember_feedback(interview_id, transcript, cached)
+            yield cached
+            return
+
+        parts = []
+        chain = await self._get_chain()
+        async with gemini_slot():
+            async for chunk in chain.astream({"transcript": transcript}):
+                parts.append(chunk)
+                yield chunk
+        feedback = "".join(parts)
+        if feedback:
+            self.response_cache.put(transcript, feedback, interview_id or "")
+            self._remember_feedback(interview_id, transcript, feedback)
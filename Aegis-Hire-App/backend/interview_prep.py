@@ -1,18 +1,103 @@
 from pydantic import BaseModel
-from typing import List, Dict, Optional
+from typing import List, Optional
+from typing_extensions import TypedDict
 import uuid
-from datetime import datetime
-import google.generativeai as genai
-import os
+import asyncio
+from datetime import datetime, timezone
+import re
+import orjson
+from functools import lru_cache
 from dotenv import load_dotenv
+from context_cache import CachedPromptModel
+from disk_store import DiskModelStore
+from genai_client import GEMINI_API_KEY, get_genai
+from response_cache import ExactLLMCache
 
 # Load environment variables
 load_dotenv()
 
-# Configure the Gemini API key
-api_key = os.getenv("GEMINI_API_KEY")
-if api_key:
-    genai.configure(api_key=api_key)
+# The Gemini SDK itself is imported and configured lazily by genai_client, which
+# also reads the key (GEMINI_API_KEY, or GOOGLE_API_KEY as a fallback)
+api_key = GEMINI_API_KEY
+
+# Fixed guide format shared by every request, stored once as Gemini cached content.
+GUIDE_SYSTEM_PROMPT = """
+You prepare interviewers for structured, fair interviews using the job description
+and candidate resume you are given.
+
+The guide has three parts:
+- key_objectives: 4 objectives the interviewer should assess
+- structured_questions: 3 questions to ask every candidate for this role
+- legal_guardrails: 3 topics or practices the interviewer must avoid
+"""
+
+
+class GuideContent(TypedDict):
+    """
+    Response schema for Gemini structured output.
+    """
+
+    key_objectives: List[str]
+    structured_questions: List[str]
+    legal_guardrails: List[str]
+
+
+# Contact details carry no signal for the guide but cost input tokens
+_CONTACT_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+|(?:https?://|www\.)\S+")
+# Phone-like digit runs; only removed when they hold 10+ digits, so date
+# ranges such as "2019 - 2021" survive
+_PHONE_RE = re.compile(r"\+?\(?\d[\d\s().-]{7,}\d")
+
+# Input budgets, in tokens. Gemini averages roughly 4 characters per token
+# for English text, which is close enough for truncation.
+RESUME_TOKEN_BUDGET = 3000
+JOB_DESCRIPTION_TOKEN_BUDGET = 2000
+CHARS_PER_TOKEN = 4
+
+
+def _compact(text: str, max_tokens: int) -> str:
+    """
+    Strip boilerplate from resume / JD text before it goes into the prompt:
+    contact details, repeated lines and redundant whitespace, then truncate
+    to the token budget.
+    """
+    text = _CONTACT_RE.sub("", text)
+    text = _PHONE_RE.sub(
+        lambda m: "" if sum(c.isdigit() for c in m.group(0)) >= 10 else m.group(0), text
+    )
+    lines = []
+    for line in text.splitlines():
+        line = " ".join(line.split()).strip(" |,;-")
+        # Skip blank lines and consecutive duplicates (repeated section titles etc.)
+        if line and (not lines or line != lines[-1]):
+            lines.append(line)
+    compacted = "\n".join(lines)
+
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(compacted) > max_chars:
+        # Cut on a line boundary where possible so the last line isn't half a sentence
+        cut = compacted.rfind("\n", 0, max_chars)
+        compacted = compacted[: cut if cut > 0 else max_chars]
+    return compacted
+
+
+def _supabase():
+    """
+    Import the Supabase client on first use rather than at module import.
+    """
+    from database import supabase
+
+    return supabase
+
+
+@lru_cache(maxsize=1)
+def _get_guide_model() -> Optional[CachedPromptModel]:
+    """
+    Build the shared model on first use; None when no API key is configured.
+    """
+    if not api_key:
+        return None
+    return CachedPromptModel("gemini-2.5-flash", GUIDE_SYSTEM_PROMPT, display_name="interview-guide-system")
 
 
 class InterviewPrepRequest(BaseModel):
@@ -39,114 +124,146 @@ class InterviewPrepService:
     """
 
     def __init__(self):
-        self.prep_guides: Dict[str, InterviewGuide] = {}
+        # Host-local store shared by all workers; Supabase (when configured) is the
+        # durable store shared across hosts
+        self.prep_guides: DiskModelStore[InterviewGuide] = DiskModelStore(
+            "interview_guides", InterviewGuide
+        )
+        self.response_cache = ExactLLMCache()
 
-    def generate_interview_guide(
+    async def generate_interview_guide(
         self, prep_request: InterviewPrepRequest
     ) -> Optional[InterviewGuide]:
         """
         Generate an interview guide based on job description, candidate info, and other factors.
         """
-        if not api_key:
+        model = _get_guide_model()
+        if model is None:
             return None
 
+        # Guides are candidate- and role-specific, so only identical job/resume input
+        # for the same candidate and interviewer may reuse a cached guide.
+        cache_scope = f"{prep_request.candidate_name}|{prep_request.interviewer_name}"
+        cache_text = "\n".join(
+            [
+                prep_request.job_title,
+                prep_request.job_description,
+                prep_request.candidate_resume,
+            ]
+        )
+        cached = self.response_cache.lookup(cache_text, cache_scope)
+        if cached is not None:
+            return cached
+
         try:
-            model = genai.GenerativeModel("gemini-2.5-flash")
+            job_description = _compact(
+                prep_request.job_description, JOB_DESCRIPTION_TOKEN_BUDGET
+            )
+            candidate_resume = _compact(prep_request.candidate_resume, RESUME_TOKEN_BUDGET)
 
-            # Create a prompt to generate the interview guide
+            # Only the per-candidate details are sent; the guide structure lives in
+            # the cached system instruction and the response schema. The job
+            # description comes first since it is shared by every candidate for the
+            # role, which lets Gemini's implicit prefix caching apply across requests.
             prep_prompt = f"""
-            Generate a comprehensive interview preparation guide for the role of {prep_request.job_title}.
-            The guide is for the interviewer: {prep_request.interviewer_name}.
-            The candidate is: {prep_request.candidate_name}.
-
-            Here is the job description:
+            Here is the job description for the role of {prep_request.job_title}:
             --- JOB DESCRIPTION START ---
-            {prep_request.job_description}
+            {job_description}
             --- JOB DESCRIPTION END ---
 
             Here is the candidate's resume:
             --- RESUME START ---
-            {prep_request.candidate_resume}
+            {candidate_resume}
             --- RESUME END ---
 
-            Please generate the guide with the following sections. Use the exact headers and formatting.
-            Do not include any other text before or after the sections.
-
-            ### KEY OBJECTIVES ###
-            - [Objective 1]
-            - [Objective 2]
-            - [Objective 3]
-            - [Objective 4]
-
-            ### STRUCTURED QUESTIONS ###
-            - [Question 1]
-            - [Question 2]
-            - [Question 3]
-
-            ### LEGAL GUARDRAILS ###
-            - [Guardrail 1]
-            - [Guardrail 2]
-            - [Guardrail 3]
+            Generate a comprehensive interview preparation guide for this role.
+            The guide is for the interviewer: {prep_request.interviewer_name}.
+            The candidate is: {prep_request.candidate_name}.
             """
 
-            response = model.generate_content(
+            response = await model.generate_content_async(
                 prep_prompt,
-                generation_config=genai.GenerationConfig(
+                generation_config=get_genai().GenerationConfig(
                     temperature=0.5,  # Balanced temperature for useful preparation
+                    response_mime_type="application/json",
+                    response_schema=GuideContent,
                 ),
             )
 
             if not response or not hasattr(response, "text") or not response.text:
                 return None
 
-            guide_text = response.text
-
-            # Helper function for parsing
-            def parse_section(text, header):
-                try:
-                    section_content = (
-                        text.split(f"### {header} ###")[1].split("###")[0].strip()
-                    )
-                    items = [
-                        item.strip().lstrip("- ").rstrip()
-                        for item in section_content.split("\n")
-                        if item.strip()
-                    ]
-                    return items
-                except IndexError:
-                    return []
-
-            key_objectives = parse_section(guide_text, "KEY OBJECTIVES")
-            structured_questions = parse_section(guide_text, "STRUCTURED QUESTIONS")
-            legal_guardrails = parse_section(guide_text, "LEGAL GUARDRAILS")
+            sections = orjson.loads(response.text)
+            key_objectives = sections.get("key_objectives", [])
+            structured_questions = sections.get("structured_questions", [])
+            legal_guardrails = sections.get("legal_guardrails", [])
 
             if not all([key_objectives, structured_questions, legal_guardrails]):
-                print("Failed to parse one or more sections from the generated guide.")
+                print("Generated guide is missing one or more sections.")
                 return None
 
             guide = InterviewGuide(
-                id=str(uuid.uuid4()),
+                id=uuid.uuid4().hex,
                 job_title=prep_request.job_title,
                 candidate_name=prep_request.candidate_name,
                 key_objectives=key_objectives,
                 structured_questions=structured_questions,
                 legal_guardrails=legal_guardrails,
-                created_at=datetime.now(),
+                created_at=datetime.now(timezone.utc),
             )
 
             # Store the guide
             self.prep_guides[guide.id] = guide
+            await asyncio.to_thread(self._persist, guide)
+            self.response_cache.put(cache_text, guide, scope=cache_scope)
             return guide
 
         except Exception as e:
             print(f"Error generating interview guide: {e}")
             return None
 
+    def _persist(self, guide: InterviewGuide):
+        """
+        Write a guide through to Supabase so it survives eviction and restarts.
+        """
+        supabase = _supabase()
+        if supabase is None:
+            return
+        try:
+            supabase.table("interview_guides").insert(
+                guide.model_dump(mode="json")
+            ).execute()
+        except Exception as e:
+            print(f"Error persisting interview guide {guide.id}: {e}")
+
     def get_interview_guide(self, guide_id: str) -> Optional[InterviewGuide]:
         """
         Retrieve an interview guide by ID.
         """
-        return self.prep_guides.get(guide_id)
+        guide = self.prep_guides.get(guide_id)
+        if guide is not None:
+            return guide
+        supabase = _supabase()
+        if supabase is None:
+            return guide
+
+        try:
+            result = (
+                supabase.table("interview_guides")
+                .select("*")
+                .eq("id", guide_id)
+                .limit(1)
+                .execute()
+            )
+        except Exception as e:
+            print(f"Error loading interview guide {guide_id}: {e}")
+            return None
+        if not result.data:
+            return None
+
+        guide = InterviewGuide.model_validate(result.data[0])
+        self.prep_guides[guide_id] = guide
+        return guide
 
 
 # Initialize the interview prep service
@@ -1,18 +1,162 @@
 from pydantic import BaseModel
-from typing import List, Dict, Optional
+from typing import Any, AsyncIterator, Iterator, List, Dict, Optional
+from typing_extensions import TypedDict
 import uuid
-from datetime import datetime
-import google.generativeai as genai
-import os
+import asyncio
+from datetime import datetime, timezone
+import orjson
+from functools import lru_cache
 from dotenv import load_dotenv
+from context_cache import CachedPromptModel
+from disk_store import DiskModelStore
+from genai_client import GEMINI_API_KEY, get_genai
+from response_cache import ExactLLMCache
 
 # Load environment variables
 load_dotenv()
 
-# Configure the Gemini API key
-api_key = os.getenv("GEMINI_API_KEY")
-if api_key:
-    genai.configure(api_key=api_key)
+# The Gemini SDK itself is imported and configured lazily by genai_client, which
+# also reads the key (GEMINI_API_KEY, or GOOGLE_API_KEY as a fallback)
+api_key = GEMINI_API_KEY
+
+# Fixed instructions for every job description request. Stored once as Gemini
+# cached content so only the user's prompt is sent per request.
+JD_SYSTEM_PROMPT = """
+You are an expert HR professional specializing in creating inclusive, professional job descriptions.
+Generate a comprehensive job description based on the provided prompt.
+
+Requirements:
+- Use inclusive language that welcomes diverse candidates
+- Include clear responsibilities and requirements
+- Specify employment type, location, and other key details
+- Include competitive benefits and company culture elements
+- Avoid discriminatory language or unnecessary barriers
+- Make requirements realistic and achievable
+- Use Full-time, Part-time or Contract for the employment type, and "Competitive"
+  as the salary range when none is given
+"""
+
+
+class JobDescriptionContent(TypedDict):
+    """
+    Response schema for Gemini structured output: the generated fields of a
+    JobDescription, without the server-assigned id and created_at.
+    """
+
+    title: str
+    company: str
+    department: str
+    location: str
+    employment_type: str
+    salary_range: str
+    overview: str
+    responsibilities: List[str]
+    requirements: List[str]
+    preferred_qualifications: List[str]
+    benefits: List[str]
+
+
+# Layout for streamed job descriptions; matches job_description_markdown so
+# both endpoints render the same document
+JD_MARKDOWN_FORMAT = """
+Write the job description as markdown in exactly this layout, with one "• " bullet per line:
+
+# <Job title>
+
+**Company:** <company>
+**Department:** <department>
+**Location:** <location>
+**Employment Type:** <employment type>
+**Salary Range:** <salary range>
+
+## About the Role
+<overview paragraph>
+
+## Key Responsibilities
+• <responsibility>
+
+## Requirements
+• <requirement>
+
+## Preferred Qualifications
+• <qualification>
+
+## Benefits
+• <benefit>
+"""
+
+
+# "**Field:** value" lines and "## Heading" sections of JD_MARKDOWN_FORMAT,
+# mapped to JobDescription fields
+_MARKDOWN_FIELDS = {
+    "company": "company",
+    "department": "department",
+    "location": "location",
+    "employment type": "employment_type",
+    "salary range": "salary_range",
+}
+_MARKDOWN_SECTIONS = {
+    "about the role": "overview",
+    "key responsibilities": "responsibilities",
+    "requirements": "requirements",
+    "preferred qualifications": "preferred_qualifications",
+    "benefits": "benefits",
+}
+
+
+def parse_job_description_markdown(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Read the fields of a JobDescription back out of markdown written in
+    JD_MARKDOWN_FORMAT. Returns None when there is no "# " title line.
+    """
+    fields: Dict[str, Any] = {field: "" for field in _MARKDOWN_FIELDS.values()}
+    fields.update(overview="", responsibilities=[], requirements=[], preferred_qualifications=[], benefits=[])
+    title = None
+    section = None
+    overview = []
+
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("## "):
+            section = _MARKDOWN_SECTIONS.get(line[3:].strip().lower())
+        elif line.startswith("# ") and title is None:
+            title = line[2:].strip()
+        elif line.startswith("**") and ":**" in line:
+            label, _, value = line[2:].partition(":**")
+            field = _MARKDOWN_FIELDS.get(label.strip().lower())
+            if field:
+                fields[field] = value.strip()
+        elif section == "overview":
+            overview.append(line)
+        elif section and line[0] in "•-*":
+            fields[section].append(line[1:].strip())
+
+    if not title:
+        return None
+    fields["title"] = title
+    fields["overview"] = " ".join(overview)
+    return fields
+
+
+def _supabase():
+    """
+    Import the Supabase client on first use rather than at module import.
+    """
+    from database import supabase
+
+    return supabase
+
+
+@lru_cache(maxsize=1)
+def _get_jd_model() -> Optional[CachedPromptModel]:
+    """
+    Build the shared model on first use; None when no API key is configured.
+    """
+    if not api_key:
+        return None
+    return CachedPromptModel("gemini-2.5-flash", JD_SYSTEM_PROMPT, display_name="job-description-system")
 
 
 class JobDescriptionRequest(BaseModel):
@@ -47,120 +191,201 @@ class JobDescriptionService:
     """
 
     def __init__(self):
-        self.job_descriptions: Dict[str, JobDescription] = {}
-
-    def generate_job_description(
+        # Host-local store shared by all workers; Supabase (when configured) is the
+        # durable store shared across hosts
+        self.job_descriptions: DiskModelStore[JobDescription] = DiskModelStore(
+            "job_descriptions", JobDescription
+        )
+        self.response_cache = ExactLLMCache()
+
+    async def generate_job_description(
         self, request: JobDescriptionRequest
     ) -> Optional[JobDescription]:
         """
         Generate a job description based on a prompt using AI.
         """
-        if not api_key:
+        model = _get_jd_model()
+        if model is None:
             print("DEBUG: No GEMINI_API_KEY found - cannot generate job description")
             return None
 
-        try:
-            model = genai.GenerativeModel("gemini-2.5-flash")
-
-            system_prompt = """
-            You are an expert HR professional specializing in creating inclusive, professional job descriptions.
-            Generate a comprehensive job description based on the provided prompt.
-
-            Requirements:
-            - Use inclusive language that welcomes diverse candidates
-            - Include clear responsibilities and requirements
-            - Specify employment type, location, and other key details
-            - Include competitive benefits and company culture elements
-            - Avoid discriminatory language or unnecessary barriers
-            - Make requirements realistic and achievable
-
-            Format your response as JSON with the following structure:
-            {
-                "title": "Job Title",
-                "company": "Company Name",
-                "department": "Department",
-                "location": "Location",
-                "employment_type": "Full-time/Part-time/Contract",
-                "salary_range": "Salary range or 'Competitive'",
-                "overview": "Brief company/role overview paragraph",
-                "responsibilities": ["Responsibility 1", "Responsibility 2", ...],
-                "requirements": ["Requirement 1", "Requirement 2", ...],
-                "preferred_qualifications": ["Preferred 1", "Preferred 2", ...],
-                "benefits": ["Benefit 1", "Benefit 2", ...]
-            }
-            """
+        # Exact prompts only: "Senior ..." and "Junior ..." prompts are semantically close
+        content = self.response_cache.lookup(request.prompt)
 
-            user_prompt = f"""
-            Create a job description based on this prompt:
-            {request.prompt}
+        try:
+            if content is None:
+                user_prompt = f"""
+                Create a job description based on this prompt:
+                {request.prompt}
+                """
+
+                # Structured output: Gemini is constrained to the schema and returns bare JSON
+                response = await model.generate_content_async(
+                    user_prompt,
+                    generation_config=get_genai().GenerationConfig(
+                        response_mime_type="application/json",
+                        response_schema=JobDescriptionContent,
+                    ),
+                )
 
-            Please provide a complete, professional job description following the JSON format specified in the system instructions.
-            """
+                if not response or not response.text:
+                    print("DEBUG: Empty response from Gemini API")
+                    return None
 
-            response = model.generate_content([system_prompt, user_prompt])
+                content = orjson.loads(response.text)
 
-            if not response or not response.text:
-                print("DEBUG: Empty response from Gemini API")
-                return None
+            # Only the generated content is cached: a repeated prompt still gets a
+            # new job description with its own id, stored like any other
+            job_description = JobDescription(
+                id=uuid.uuid4().hex,
+                created_at=datetime.now(timezone.utc),
+                **content,
+            )
 
-            # Try to parse the JSON response
-            import json
+            # Store the job description
+            self.job_descriptions[job_description.id] = job_description
+            await asyncio.to_thread(self._persist, job_description)
+            self.response_cache.put(request.prompt, content)
 
-            try:
-                # Extract JSON from response (in case there's extra text)
-                response_text = response.text.strip()
-                if response_text.startswith("```json"):
-                    response_text = response_text[7:]
-                if response_text.endswith("```"):
-                    response_text = response_text[:-3]
-
-                job_data = json.loads(response_text.strip())
-
-                # Create JobDescription object
-                job_description = JobDescription(
-                    id=str(uuid.uuid4()),
-                    title=job_data.get("title", ""),
-                    company=job_data.get("company", ""),
-                    department=job_data.get("department", ""),
-                    location=job_data.get("location", ""),
-                    employment_type=job_data.get("employment_type", ""),
-                    salary_range=job_data.get("salary_range", ""),
-                    overview=job_data.get("overview", ""),
-                    responsibilities=job_data.get("responsibilities", []),
-                    requirements=job_data.get("requirements", []),
-                    preferred_qualifications=job_data.get(
-                        "preferred_qualifications", []
-                    ),
-                    benefits=job_data.get("benefits", []),
-                    created_at=datetime.now(),
-                )
+            return job_description
 
-                # Store the job description
-                self.job_descriptions[job_description.id] = job_description
+        except Exception as e:
+            print(f"DEBUG: Error generating job description: {e}")
+            return None
 
-                return job_description
+    async def stream_job_description(
+        self, request: JobDescriptionRequest
+    ) -> AsyncIterator[str]:
+        """
+        Stream a job description as markdown while Gemini generates it, so the
+        first lines reach the client after the first tokens rather than the full
+        response. Once the stream completes, the description is parsed and stored
+        like a generated one; a cached markdown answer is also stored as a new
+        job description.
+        """
+        model = _get_jd_model()
+        if model is None:
+            print("DEBUG: No GEMINI_API_KEY found - cannot generate job description")
+            return
 
-            except json.JSONDecodeError as e:
-                print(f"DEBUG: Failed to parse JSON response: {e}")
-                print(f"DEBUG: Raw response: {response.text}")
-                return None
+        markdown = self.response_cache.lookup(request.prompt, "markdown")
+        if markdown is not None:
+            yield markdown
+        else:
+            user_prompt = f"""
+            Create a job description based on this prompt:
+            {request.prompt}
+            {JD_MARKDOWN_FORMAT}
+            """
 
+            parts = []
+            response = await model.generate_content_async(user_prompt, stream=True)
+            async for chunk in response:
+                # The final chunk may carry only the finish reason and no text
+                if chunk.parts:
+                    parts.append(chunk.text)
+                    yield chunk.text
+
+            markdown = "".join(parts)
+            if not markdown.strip():
+                return
+            self.response_cache.put(request.prompt, markdown, scope="markdown")
+
+        fields = parse_job_description_markdown(markdown)
+        if fields is None:
+            print("DEBUG: Streamed job description has no title, not stored")
+            return
+        job_description = JobDescription(
+            id=uuid.uuid4().hex, created_at=datetime.now(timezone.utc), **fields
+        )
+        self.job_descriptions[job_description.id] = job_description
+        await asyncio.to_thread(self._persist, job_description)
+
+    def _persist(self, job_description: JobDescription):
+        """
+        Write a job description through to Supabase so it survives eviction and restarts.
+        """
+        supabase = _supabase()
+        if supabase is None:
+            return
+        try:
+            supabase.table("job_descriptions").insert(
+                job_description.model_dump(mode="json")
+            ).execute()
         except Exception as e:
-            print(f"DEBUG: Error generating job description: {e}")
-            return None
+            print(f"DEBUG: Failed to persist job description {job_description.id}: {e}")
 
     def get_job_description(self, job_id: str) -> Optional[JobDescription]:
         """
         Retrieve a job description by ID.
         """
-        return self.job_descriptions.get(job_id)
+        job_description = self.job_descriptions.get(job_id)
+        if job_description is not None:
+            return job_description
+        supabase = _supabase()
+        if supabase is None:
+            return job_description
+
+        try:
+            result = (
+                supabase.table("job_descriptions")
+                .select("*")
+                .eq("id", job_id)
+                .limit(1)
+                .execute()
+            )
+        except Exception as e:
+            print(f"DEBUG: Failed to load job description {job_id}: {e}")
+            return None
+        if not result.data:
+            return None
+
+        job_description = JobDescription.model_validate(result.data[0])
+        self.job_descriptions[job_id] = job_description
+        return job_description
 
     def get_all_job_descriptions(self) -> List[JobDescription]:
         """
         Get all stored job descriptions.
         """
+        supabase = _supabase()
+        if supabase is not None:
+            try:
+                result = (
+                    supabase.table("job_descriptions")
+                    .select("*")
+                    .order("created_at")
+                    .execute()
+                )
+                return [JobDescription.model_validate(row) for row in result.data]
+            except Exception as e:
+                print(f"DEBUG: Failed to list job descriptions: {e}")
         return list(self.job_descriptions.values())
 
 
+def job_description_markdown(job_description: JobDescription) -> Iterator[str]:
+    """
+    Yield the pieces of a job description rendered as markdown, for a single
+    "".join instead of one temporary string per section.
+    """
+    yield f"# {job_description.title}\n\n"
+    yield f"**Company:** {job_description.company}\n"
+    yield f"**Department:** {job_description.department}\n"
+    yield f"**Location:** {job_description.location}\n"
+    yield f"**Employment Type:** {job_description.employment_type}\n"
+    yield f"**Salary Range:** {job_description.salary_range}\n\n"
+    yield f"## About the Role\n{job_description.overview}\n"
+
+    for heading, items in (
+        ("Key Responsibilities", job_description.responsibilities),
+        ("Requirements", job_description.requirements),
+        ("Preferred Qualifications", job_description.preferred_qualifications),
+        ("Benefits", job_description.benefits),
+    ):
+        yield f"\n## {heading}\n"
+        for item in items:
+            yield f"• {item}\n"
+
+
 # Global service instance
 job_description_service = JobDescriptionService()
@@ -1,23 +1,32 @@
-from pydantic import BaseModel
+from dataclasses import dataclass, field
 from typing import List, Dict, Optional
+from typing_extensions import TypedDict
 import uuid
-from datetime import datetime
-import google.generativeai as genai
+from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
 import asyncio
+import hashlib
 import json
+import orjson
+import logging
+import re
 from enum import Enum
+from functools import lru_cache
+from cachetools import TTLCache
 from interview_moderator import InterviewModerator
+from context_cache import CachedPromptModel
+from genai_client import GEMINI_API_KEY, get_genai
 
 
 # Load environment variables
 load_dotenv()
 
-# Configure the Gemini API key
-api_key = os.getenv("GOOGLE_API_KEY")
-if api_key:
-    genai.configure(api_key=api_key)
+# The Gemini SDK itself is imported and configured lazily by genai_client, from
+# the same key that decides between Gemini reviews and the keyword fallback
+api_key = GEMINI_API_KEY
+
+logger = logging.getLogger(__name__)
 
 
 class InterviewEventType(str, Enum):
@@ -28,13 +37,433 @@ class InterviewEventType(str, Enum):
     INTERVIEW_MODERATOR = "interview_moderator"
 
 
-class InterviewEvent(BaseModel):
+class TranscriptReview(TypedDict):
+    """
+    Response schema for the combined topic coverage + bias review.
+    """
+
+    topic_gaps: List[str]
+    bias_flags: List[str]
+    summary: str
+
+
+class BatchedTranscriptReview(TypedDict):
+    """
+    One entry of a batched review response; index refers to the review's
+    position in the batch prompt.
+    """
+
+    index: int
+    topic_gaps: List[str]
+    bias_flags: List[str]
+    summary: str
+
+
+# Obvious bias indicators for the no-API-key fallback, matched in one
+# case-insensitive pass. Longer phrases come first so they win over their prefixes.
+BIAS_PHRASES = [
+    "young man's game",
+    "married",
+    "kids",
+    "family",
+    "personal life",
+    "age",
+    "young",
+    "old",
+    "stamina",
+]
+_BIAS_PHRASE_RE = re.compile(
+    "|".join(re.escape(p) for p in sorted(BIAS_PHRASES, key=len, reverse=True)),
+    re.IGNORECASE,
+)
+
+# Topic the no-API-key coverage fallback looks for (from the placeholder job description)
+_FALLBACK_TOPIC_RE = re.compile(r"kubernetes", re.IGNORECASE)
+
+
+# What each transcript review returns; shared by single and batched prompts
+REVIEW_FIELDS = """
+1. topic_gaps: key competencies or requirements from the job description that
+   the conversation as a whole has not covered yet, phrased as topics to cover.
+   Empty if none.
+2. bias_flags: potential bias, discriminatory language or inappropriate topics
+   in the new transcript that should be avoided, with legal compliance and fair
+   interviewing practices in mind. Empty if none.
+3. summary: an updated summary of the whole conversation so far (topics covered
+   and key answers), in at most 150 words.
+"""
+
+# Opt-in: reviews from concurrent sessions with the same job description that
+# queue up within this window are sent to Gemini as one request
+REVIEW_BATCHING = os.getenv("REVIEW_BATCHING", "false").lower() == "true"
+REVIEW_BATCH_WINDOW_SECONDS = float(os.getenv("REVIEW_BATCH_WINDOW_SECONDS", "1"))
+REVIEW_BATCH_MAX_SIZE = 8
+# A batched request is cancelled after this long and its reviews sent one by one
+REVIEW_BATCH_TIMEOUT_SECONDS = 30
+
+# Sessions are dropped after an hour without a transcript chunk, and the oldest
+# are evicted beyond this many, so finished interviews don't accumulate forever
+MAX_LIVE_SESSIONS = 10_000
+SESSION_IDLE_TTL_SECONDS = 3600
+
+
+# Fixed part of a single-session review. Together with the interview's job
+# description it is stored once as Gemini cached content, so each review only
+# sends the summary and the new transcript.
+REVIEW_SYSTEM_PROMPT = (
+    "You review the latest part of an ongoing job interview. For each review, return:\n"
+    + REVIEW_FIELDS
+)
+
+
+# Hard cap on a review's output. The JSON itself (short lists plus a 150-word
+# summary) needs a few hundred tokens; the rest is headroom for the model's
+# thinking tokens, which count against the same limit.
+REVIEW_MAX_OUTPUT_TOKENS = 1024
+
+# Review configs are built on first use, not at import, so importing this module
+# doesn't load the Gemini SDK; each is then reused
+@lru_cache(maxsize=1)
+def _get_review_config():
+    return get_genai().GenerationConfig(
+        temperature=0.2,  # Low temperature for consistent analysis
+        max_output_tokens=REVIEW_MAX_OUTPUT_TOKENS,
+        response_mime_type="application/json",
+        response_schema=TranscriptReview,
+    )
+
+
+@lru_cache(maxsize=1)
+def _get_batch_review_config():
+    return get_genai().GenerationConfig(
+        temperature=0.2,
+        max_output_tokens=REVIEW_MAX_OUTPUT_TOKENS * REVIEW_BATCH_MAX_SIZE,
+        response_mime_type="application/json",
+        response_schema=List[BatchedTranscriptReview],
+    )
+
+
+def _review_update(new_text: str, summary: str) -> str:
+    return f"""
+Summary of the conversation so far:
+{summary or "(the interview has just started)"}
+
+New transcript since the last review:
+{new_text}
+"""
+
+
+@lru_cache(maxsize=32)
+def _get_review_model(job_description: str) -> CachedPromptModel:
+    """
+    One cached-content model per job description in use; an interview keeps the
+    same job description throughout, so every review after the first hits the cache.
+    """
+    return CachedPromptModel(
+        "gemini-2.5-flash",
+        REVIEW_SYSTEM_PROMPT + "\nJob Description:\n" + job_description,
+        ttl=timedelta(minutes=30),
+        display_name="live-review-"
+        + hashlib.blake2b(job_description.encode(), digest_size=4).hexdigest(),
+    )
+
+
+async def _request_review(
+    new_text: str, summary: str, job_description: str
+) -> Optional[Dict]:
+    """
+    Ask Gemini for the combined topic coverage + bias review of the new part of
+    the transcript, along with an updated summary of the conversation.
+    """
+    # Building the model touches no network; the cache itself is created lazily
+    model = _get_review_model(job_description)
+
+    response = await model.generate_content_async(
+        _review_update(new_text, summary), generation_config=_get_review_config()
+    )
+
+    if not response or not hasattr(response, "text") or not response.text:
+        return None
+
+    return json.loads(response.text)
+
+
+async def _request_batched_review(
+    items: List[tuple], job_description: str
+) -> Dict[int, Dict]:
+    """
+    Review several sessions' transcripts for the same job description in one
+    Gemini request, through that job description's cached-content model. Returns
+    the reviews by batch index; indexes missing from the response are left out.
+    """
+    blocks = "".join(
+        f"\n### Review {index} ###" + _review_update(*item)
+        for index, item in enumerate(items)
+    )
+    review_prompt = (
+        "Review the latest part of each of the following ongoing interviews. "
+        "Treat every review independently and return one result per review, "
+        "with its index.\n" + blocks
+    )
+
+    response = await _get_review_model(job_description).generate_content_async(
+        review_prompt, generation_config=_get_batch_review_config()
+    )
+
+    if not response or not hasattr(response, "text") or not response.text:
+        return {}
+
+    return {
+        review["index"]: review
+        for review in json.loads(response.text)
+        if isinstance(review.get("index"), int) and 0 <= review["index"] < len(items)
+    }
+
+
+class ReviewBatcher:
+    """
+    Coalesces transcript reviews from concurrent interview sessions into a single
+    Gemini request, cutting per-request overhead when many interviews are live.
+    Only used when REVIEW_BATCHING is enabled.
+
+    A review that finds the queue empty is sent at once as a normal request. When
+    others are already waiting, the batcher collects reviews for
+    REVIEW_BATCH_WINDOW_SECONDS; only reviews of the same job description share a
+    request. Reviews missing from a batch response, or a batch that fails or times
+    out, fall back to individual requests.
+    """
+
+    def __init__(
+        self,
+        window: float = REVIEW_BATCH_WINDOW_SECONDS,
+        max_batch: int = REVIEW_BATCH_MAX_SIZE,
+    ):
+        self.window = window
+        self.max_batch = max_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # Strong references so in-flight batches aren't garbage collected
+        self._batches: set = set()
+
+    async def review(
+        self, new_text: str, summary: str, job_description: str
+    ) -> Optional[Dict]:
+        # Started lazily: the worker needs the running event loop
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((new_text, summary, job_description, future))
+        # The dispatcher owns the timeout and fallback, so the review is only ever
+        # requested once; if this caller goes away, its review is skipped
+        return await future
+
+    async def _run(self):
+        while True:
+            pending = [await self._queue.get()]
+            # Wait for more reviews only when other sessions are already queued
+            if not self._queue.empty():
+                await asyncio.sleep(self.window)
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+
+            # Sessions only share a request with others reviewing the same job
+            # description (dict keeps arrival order)
+            by_job: Dict[str, List[tuple]] = {}
+            for entry in pending:
+                by_job.setdefault(entry[2], []).append(entry)
+            for entries in by_job.values():
+                for start in range(0, len(entries), self.max_batch):
+                    task = asyncio.create_task(
+                        self._dispatch(entries[start : start + self.max_batch])
+                    )
+                    self._batches.add(task)
+                    task.add_done_callback(self._batches.discard)
+
+    @staticmethod
+    async def _resolve(future: asyncio.Future, item: tuple):
+        try:
+            result = await _request_review(*item)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
+
+    async def _dispatch(self, batch: List[tuple]):
+        # Skip reviews whose session has stopped waiting for them
+        batch = [entry for entry in batch if not entry[3].done()]
+        reviews: Dict[int, Dict] = {}
+        if len(batch) > 1:
+            try:
+                # wait_for cancels the batch on timeout, so the individual requests
+                # below never run alongside it
+                reviews = await asyncio.wait_for(
+                    _request_batched_review([entry[:2] for entry in batch], batch[0][2]),
+                    REVIEW_BATCH_TIMEOUT_SECONDS,
+                )
+                logger.debug("Batched review of %d sessions, %d returned", len(batch), len(reviews))
+            except asyncio.TimeoutError:
+                logger.warning("Batched review timed out, reviewing individually")
+            except Exception as e:
+                logger.warning("Batched review failed, reviewing individually: %s", e)
+
+        retries = []
+        for index, (*item, future) in enumerate(batch):
+            if future.done():
+                continue
+            if index in reviews:
+                future.set_result(reviews[index])
+            else:
+                retries.append(self._resolve(future, item))
+        await asyncio.gather(*retries)
+
+
+@dataclass(slots=True, frozen=True)
+class InterviewEvent:
+    """
+    A nudge produced by the live assistant. Events are only ever built internally,
+    so a plain dataclass is used instead of a validating Pydantic model.
+    """
+
     id: str
     interview_session_id: str
     event_type: InterviewEventType
     message: str
     timestamp: datetime
-    metadata: Optional[Dict] = {}
+    metadata: Optional[Dict] = field(default_factory=dict)
+
+    def to_json(self) -> str:
+        """
+        Serialize for the WebSocket; orjson encodes dataclasses, enums and
+        datetimes natively.
+        """
+        return orjson.dumps(self).decode()
+
+    @classmethod
+    def from_json(cls, data: str) -> "InterviewEvent":
+        fields = orjson.loads(data)
+        fields["event_type"] = InterviewEventType(fields["event_type"])
+        fields["timestamp"] = datetime.fromisoformat(fields["timestamp"])
+        return cls(**fields)
+
+
+@dataclass(slots=True)
+class SessionState:
+    """
+    Everything tracked for one live interview session, so each chunk needs a
+    single dict lookup rather than one per bookkeeping map.
+    """
+
+    session_id: str
+    events: List[InterviewEvent] = field(default_factory=list)
+    # Transcript deltas; joined they form the full transcript
+    transcript_parts: List[str] = field(default_factory=list)
+    transcript_length: int = 0
+    # Running word count, updated from each delta
+    word_count: int = 0
+    # Word counts at the last analyses, to avoid excessive API calls
+    talk_ratio: int = 0
+    review: int = 0
+    # How far into the transcript the review has read, and a running summary of
+    # everything before that point
+    review_offset: int = 0
+    review_summary: str = ""
+    # Last moderator feedback sent, so repeats are not re-sent
+    last_moderator_feedback: Optional[str] = None
+    # Highest chunk sequence number received from the client
+    last_seq: int = -1
+
+
+# Scalar SessionState fields mirrored into the Redis hash
+_STATE_FIELDS = (
+    "transcript_length",
+    "word_count",
+    "talk_ratio",
+    "review",
+    "review_offset",
+    "review_summary",
+    "last_moderator_feedback",
+    "last_seq",
+)
+
+
+class RedisSessionStore:
+    """
+    Mirrors live interview sessions into Redis so any worker can serve a session:
+    a reconnecting client may land on a different process, and the events and
+    transcript endpoints can be answered from anywhere.
+
+    Per session: a hash of the scalar state, a list of transcript deltas and a list
+    of events (as JSON). All three keys expire after SESSION_IDLE_TTL_SECONDS
+    without activity, matching the in-process cache.
+    """
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url, decode_responses=True)
+
+    @classmethod
+    def from_env(cls) -> Optional["RedisSessionStore"]:
+        url = os.getenv("REDIS_URL")
+        return cls(url) if url else None
+
+    @staticmethod
+    def _keys(session_id: str):
+        prefix = f"aegis:session:{session_id}"
+        return f"{prefix}:state", f"{prefix}:parts", f"{prefix}:events"
+
+    async def load(self, session_id: str) -> Optional[SessionState]:
+        state_key, parts_key, events_key = self._keys(session_id)
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.hgetall(state_key)
+            pipe.lrange(parts_key, 0, -1)
+            pipe.lrange(events_key, 0, -1)
+            fields, parts, events = await pipe.execute()
+        if not fields:
+            return None
+
+        return SessionState(
+            session_id,
+            events=[InterviewEvent.from_json(event) for event in events],
+            transcript_parts=parts,
+            transcript_length=int(fields["transcript_length"]),
+            word_count=int(fields["word_count"]),
+            talk_ratio=int(fields["talk_ratio"]),
+            review=int(fields["review"]),
+            review_offset=int(fields["review_offset"]),
+            review_summary=fields["review_summary"],
+            last_moderator_feedback=fields["last_moderator_feedback"] or None,
+            last_seq=int(fields.get("last_seq", -1)),
+        )
+
+    async def transcript_length(self, session_id: str) -> Optional[int]:
+        """
+        Cheap freshness check: the stored transcript length, if the session exists.
+        """
+        length = await self._redis.hget(self._keys(session_id)[0], "transcript_length")
+        return int(length) if length is not None else None
+
+    async def save(self, state: SessionState, new_events: List[InterviewEvent]):
+        """
+        Write one chunk's changes: the newest transcript delta, the new events and
+        the scalar state.
+        """
+        state_key, parts_key, events_key = self._keys(state.session_id)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.rpush(parts_key, state.transcript_parts[-1])
+            if new_events:
+                pipe.rpush(events_key, *(event.to_json() for event in new_events))
+            mapping = {name: getattr(state, name) for name in _STATE_FIELDS}
+            # Redis can't store None
+            mapping["last_moderator_feedback"] = state.last_moderator_feedback or ""
+            pipe.hset(state_key, mapping=mapping)
+            for key in (state_key, parts_key, events_key):
+                pipe.expire(key, SESSION_IDLE_TTL_SECONDS)
+            await pipe.execute()
 
 
 class LiveInterviewService:
@@ -45,85 +474,146 @@ class LiveInterviewService:
     """
 
     def __init__(self):
-        self.active_sessions: Dict[str, List[InterviewEvent]] = {}
-        self.transcript_parts: Dict[str, List[str]] = {}
-        # Track analysis triggers to avoid excessive API calls
-        self.analysis_triggers: Dict[str, Dict[str, int]] = {}
+        self.sessions: TTLCache = TTLCache(
+            maxsize=MAX_LIVE_SESSIONS, ttl=SESSION_IDLE_TTL_SECONDS
+        )
+        # Optional shared store (REDIS_URL) for running several workers/hosts
+        self.store = RedisSessionStore.from_env()
         self.moderator = InterviewModerator()
+        self.review_batcher = ReviewBatcher() if REVIEW_BATCHING else None
 
     async def process_transcript_chunk(
-        self, interview_session_id: str, transcript_chunk: str, job_description: str
+        self,
+        interview_session_id: str,
+        transcript_chunk: str,
+        job_description: str,
+        seq: Optional[int] = None,
     ) -> List[InterviewEvent]:
         """
         Process a chunk of transcript and generate relevant interview assistance events.
+        seq is the client's number for the chunk; a chunk numbered at or below the
+        last one seen is a resend and is ignored. Chunks without one are always new.
         """
-        print(f"\n--- DEBUG: Processing chunk for session {interview_session_id} ---")
-        print(f'Chunk: "{transcript_chunk[:100]}..."')
-        print(f"API Key available: {api_key is not None}")
-        events = []
-
-        # The frontend now sends the full transcript in each "chunk".
-        # We will treat the incoming chunk as the full, authoritative transcript.
-        full_transcript = transcript_chunk
-
-        # Initialize triggers for a new session
-        if interview_session_id not in self.analysis_triggers:
-            self.analysis_triggers[interview_session_id] = {
-                "talk_ratio": 0,
-                "topic_coverage": 0,
-                "bias_detection": 0,
-            }
-
-        # Store the full transcript for the get_full_transcript method.
-        # Storing it in a list to maintain compatibility with that method's join logic.
-        self.transcript_parts[interview_session_id] = [full_transcript]
-
-        # Generate assistance events based on the transcript
-        events.extend(
-            await self._analyze_talk_ratio(interview_session_id, full_transcript)
-        )
-        events.extend(
-            await self._check_topic_coverage(
-                interview_session_id, full_transcript, job_description
+        # Guarded so the slice isn't taken when debug logging is off
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Processing chunk for session %s, tail: %r",
+                interview_session_id,
+                transcript_chunk[-100:],
             )
-        )
-        events.extend(
-            await self._detect_potential_bias(interview_session_id, full_transcript)
-        )
+        events = []
 
-        events.extend(
-            await self._get_moderator_feedback(interview_session_id, full_transcript)
+        state = await self._get_session(interview_session_id)
+        if state is None:
+            state = SessionState(interview_session_id)
+        # (Re)assigning restarts the idle TTL for an active session
+        self.sessions[interview_session_id] = state
+
+        # A resent chunk (network retry, reconnect) has nothing new to analyze; any
+        # nudges for it were already sent. Matching on the text instead would drop a
+        # genuinely repeated utterance, such as "Yes." twice in a row.
+        if seq is not None:
+            if seq <= state.last_seq:
+                logger.debug(
+                    "Chunk %d already processed for session %s", seq, interview_session_id
+                )
+                return events
+            state.last_seq = seq
+
+        # The frontend sends only the speech finalized since its previous chunk, so
+        # each chunk is appended to the session's transcript
+        self._record_transcript(state, transcript_chunk)
+        full_transcript = "".join(state.transcript_parts)
+
+        # The analyzers are independent, so run them concurrently: wall time is the
+        # slowest call rather than the sum. One failing analyzer must not drop the
+        # events produced by the others.
+        results = await asyncio.gather(
+            self._analyze_talk_ratio(state),
+            self._review_transcript(state, full_transcript, job_description),
+            self._get_moderator_feedback(state, full_transcript),
+            return_exceptions=True,
         )
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.warning(
+                    "Analyzer failed for session %s: %s", interview_session_id, result
+                )
+                continue
+            events.extend(result)
 
         # The AUTOMATIC_SCRIBE event is removed to avoid sending the entire (and growing)
         # transcript back to the frontend with every message. The frontend
         # was ignoring this event anyway.
 
         # Store events
-        if interview_session_id not in self.active_sessions:
-            self.active_sessions[interview_session_id] = []
-        self.active_sessions[interview_session_id].extend(events)
-
-        print(
-            f"DEBUG: Generated {len(events)} events for session {interview_session_id}"
-        )
-        for event in events:
-            print(f"  - {event.event_type}: {event.message[:50]}...")
+        state.events.extend(events)
+        if self.store is not None:
+            try:
+                await self.store.save(state, events)
+            except Exception as e:
+                logger.warning("Failed to save session %s to Redis: %s", interview_session_id, e)
+
+        if events and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Generated %d events for session %s: %s",
+                len(events),
+                interview_session_id,
+                ", ".join(event.event_type.value for event in events),
+            )
 
         return events
 
+    async def _get_session(self, interview_session_id: str) -> Optional[SessionState]:
+        """
+        The session from this process, or from the shared store if another worker
+        has been handling it.
+        """
+        state = self.sessions.get(interview_session_id)
+        if self.store is None:
+            return state
+        try:
+            # The local copy is stale if another worker has handled the session since
+            if state is None or (
+                await self.store.transcript_length(interview_session_id)
+                not in (None, state.transcript_length)
+            ):
+                state = await self.store.load(interview_session_id) or state
+        except Exception as e:
+            logger.warning("Failed to load session %s from Redis: %s", interview_session_id, e)
+        return state
+
+    def _record_transcript(self, state: SessionState, delta: str):
+        """
+        Append a transcript delta from the frontend, keeping the running length and
+        word count up to date without rescanning the whole transcript.
+        """
+        parts = state.transcript_parts
+        last_part = parts[-1] if parts else ""
+        added_words = len(delta.split())
+        # A delta that starts mid-word continues the previous last word (the
+        # frontend joins deltas without a separator)
+        if added_words and last_part and not last_part[-1].isspace() and not delta[0].isspace():
+            added_words -= 1
+        parts.append(delta)
+        state.transcript_length += len(delta)
+        state.word_count += added_words
+
     async def _get_moderator_feedback(
-        self, interview_session_id: str, transcript: str
+        self, state: SessionState, transcript: str
     ) -> List[InterviewEvent]:
         """
         Generate feedback from the interview moderator.
         """
         events = []
-        feedback = self.moderator.generate_feedback(transcript)
-        if feedback:
+        feedback = await self.moderator.agenerate_feedback(
+            transcript, interview_id=state.session_id
+        )
+        if feedback and feedback != state.last_moderator_feedback:
+            state.last_moderator_feedback = feedback
             feedback_event = InterviewEvent(
-                id=str(uuid.uuid4()),
-                interview_session_id=interview_session_id,
+                id=uuid.uuid4().hex,
+                interview_session_id=state.session_id,
                 event_type=InterviewEventType.INTERVIEW_MODERATOR,
                 message=feedback,
                 timestamp=datetime.now(),
@@ -132,9 +622,7 @@ class LiveInterviewService:
             events.append(feedback_event)
         return events
 
-    async def _analyze_talk_ratio(
-        self, interview_session_id: str, transcript: str
-    ) -> List[InterviewEvent]:
+    async def _analyze_talk_ratio(self, state: SessionState) -> List[InterviewEvent]:
         """
         Analyze the talk ratio between interviewer and interviewee.
         This is a simplified analysis without speaker diarization.
@@ -143,19 +631,18 @@ class LiveInterviewService:
         """
         events = []
 
-        triggers = self.analysis_triggers.get(interview_session_id, {})
-        last_check_length = triggers.get("talk_ratio", 0)
-        current_length = len(transcript.split())
-
-        print(
-            f"DEBUG: Talk Ratio check. Growth: {current_length - last_check_length} words. (Threshold: >150)"
+        last_check_length = state.talk_ratio
+        current_length = state.word_count
+        logger.debug(
+            "Talk ratio check: grew %d words (threshold >150)",
+            current_length - last_check_length,
         )
         # If transcript has grown by over 150 words since last check, trigger a nudge.
         if current_length - last_check_length > 150:
-            print("DEBUG: ---> TALK RATIO NUDGE TRIGGERED <---")
+            logger.debug("Talk ratio nudge triggered")
             ratio_event = InterviewEvent(
-                id=str(uuid.uuid4()),
-                interview_session_id=interview_session_id,
+                id=uuid.uuid4().hex,
+                interview_session_id=state.session_id,
                 event_type=InterviewEventType.TALK_RATIO_MONITOR,
                 message="Consider allowing the candidate more time to speak.",
                 timestamp=datetime.now(),
@@ -165,213 +652,148 @@ class LiveInterviewService:
             )
             events.append(ratio_event)
             # Update the length for the next check
-            if interview_session_id in self.analysis_triggers:
-                self.analysis_triggers[interview_session_id]["talk_ratio"] = (
-                    current_length
-                )
+            state.talk_ratio = current_length
 
         return events
 
-    async def _check_topic_coverage(
-        self, interview_session_id: str, transcript: str, job_description: str
+    async def _review_transcript(
+        self, state: SessionState, transcript: str, job_description: str
     ) -> List[InterviewEvent]:
         """
-        Check if key topics from the job description are covered in the interview.
+        Check topic coverage against the job description and look for potential bias
+        in a single Gemini call, since both reviews run on the same transcript at the
+        same cadence.
         """
-        triggers = self.analysis_triggers.get(interview_session_id, {})
-        last_check_length = triggers.get("topic_coverage", 0)
-        current_length = len(transcript.split())
-
+        current_length = state.word_count
         # Trigger analysis every ~50 words (lowered for faster dev feedback).
         # Increase this back to ~250 for production to reduce API calls.
-        if current_length - last_check_length < 50:
+        if current_length - state.review < 50:
             return []
 
         # Update the trigger length before making the API call
-        if interview_session_id in self.analysis_triggers:
-            self.analysis_triggers[interview_session_id]["topic_coverage"] = (
-                current_length
-            )
+        state.review = current_length
 
-        events = []
-        print("DEBUG: ---> TOPIC COVERAGE ANALYSIS TRIGGERED <---")
+        logger.debug("Topic coverage + bias review triggered")
 
         if not api_key:
-            print("DEBUG: No API key - using fallback topic coverage check")
-            # Fallback: Check if Kubernetes is mentioned (from job description)
-            if "kubernetes" not in transcript.lower() and current_length > 100:
-                topic_event = InterviewEvent(
-                    id=str(uuid.uuid4()),
-                    interview_session_id=interview_session_id,
-                    event_type=InterviewEventType.TOPIC_TRACKER,
-                    message="Consider asking about Kubernetes experience, which is mentioned in the job requirements.",
-                    timestamp=datetime.now(),
-                    metadata={"fallback": True},
-                )
-                events.append(topic_event)
-            return events
+            logger.debug("No API key - using fallback topic coverage and bias checks")
+            # Only text added since the last check is scanned for bias phrases
+            new_text = transcript[state.review_offset :]
+            state.review_offset = len(transcript)
+            return self._fallback_topic_coverage(
+                state.session_id, transcript, current_length
+            ) + self._fallback_bias_detection(state.session_id, new_text)
 
+        events = []
+        # Only the text added since the last review is sent, together with a running
+        # summary of the conversation before it, so prompt size stays flat as the
+        # interview goes on instead of growing with the full transcript.
+        summary = state.review_summary
+        new_text = transcript[state.review_offset :]
         try:
-            model = genai.GenerativeModel("gemini-2.5-flash")
-
-            # Create a prompt to analyze topic coverage
-            coverage_prompt = f"""
-            Analyze the following interview transcript and check if it covers the key requirements from the job description.
-
-            Job Description:
-            {job_description}
-
-            Interview Transcript:
-            {transcript}
-
-            Identify if any key competencies or requirements from the job description are missing from the conversation.
-            If so, suggest what topics should be covered.
-            """
-
-            response = model.generate_content(
-                coverage_prompt,
-                generation_config=genai.GenerationConfig(
-                    temperature=0.3,  # Low temperature for consistent analysis
-                ),
-            )
-
-            if response and hasattr(response, "text") and response.text:
-                # In a real implementation, we would parse the response to extract structured data
-                # For now, we'll just create an event if the response contains suggestions
-                if (
-                    "missing" in response.text.lower()
-                    or "should" in response.text.lower()
-                ):
-                    print("DEBUG: ---> Topic nudge condition MET. Creating event. <---")
-                    topic_event = InterviewEvent(
-                        id=str(uuid.uuid4()),
-                        interview_session_id=interview_session_id,
+            if self.review_batcher is not None:
+                review = await self.review_batcher.review(new_text, summary, job_description)
+            else:
+                review = await _request_review(new_text, summary, job_description)
+            if review is None:
+                return events
+
+            state.review_offset = len(transcript)
+            state.review_summary = review.get("summary", summary)
+
+            topic_gaps = review.get("topic_gaps", [])
+            bias_flags = review.get("bias_flags", [])
+
+            if topic_gaps:
+                logger.debug("Topic nudge condition met")
+                events.append(
+                    InterviewEvent(
+                        id=uuid.uuid4().hex,
+                        interview_session_id=state.session_id,
                         event_type=InterviewEventType.TOPIC_TRACKER,
-                        message="Consider covering these topics: "
-                        + response.text[:100]
-                        + "...",
+                        message="Consider covering these topics: " + ", ".join(topic_gaps),
+                        timestamp=datetime.now(),
+                        metadata={"topic_gaps": topic_gaps},
+                    )
+                )
+            if bias_flags:
+                logger.debug("Bias nudge condition met")
+                events.append(
+                    InterviewEvent(
+                        id=uuid.uuid4().hex,
+                        interview_session_id=state.session_id,
+                        event_type=InterviewEventType.BIAS_INTERRUPTER,
+                        message="Potential bias detected: " + "; ".join(bias_flags),
                         timestamp=datetime.now(),
-                        metadata={"analysis": response.text},
+                        metadata={"bias_flags": bias_flags},
                     )
-                    events.append(topic_event)
+                )
 
         except Exception as e:
-            print(f"Error analyzing topic coverage: {e}")
+            logger.warning("Error reviewing transcript: %s", e)
 
         return events
 
-    async def _detect_potential_bias(
-        self, interview_session_id: str, transcript: str
+    def _fallback_topic_coverage(
+        self, interview_session_id: str, transcript: str, current_length: int
     ) -> List[InterviewEvent]:
         """
-        Detect potential bias in the interview conversation.
+        Keyword-based topic coverage check used when no API key is configured.
         """
-        triggers = self.analysis_triggers.get(interview_session_id, {})
-        last_check_length = triggers.get("bias_detection", 0)
-        current_length = len(transcript.split())
-
-        # Trigger analysis every ~50 words (lowered for faster dev feedback).
-        # Increase this back to ~200 for production to reduce API calls.
-        if current_length - last_check_length < 50:
-            return []
-
-        # Update the trigger length before making the API call
-        if interview_session_id in self.analysis_triggers:
-            self.analysis_triggers[interview_session_id]["bias_detection"] = (
-                current_length
+        events = []
+        # Fallback: Check if Kubernetes is mentioned (from job description)
+        # Case-insensitive search avoids lowercasing a copy of the whole transcript
+        if current_length > 100 and not _FALLBACK_TOPIC_RE.search(transcript):
+            topic_event = InterviewEvent(
+                id=uuid.uuid4().hex,
+                interview_session_id=interview_session_id,
+                event_type=InterviewEventType.TOPIC_TRACKER,
+                message="Consider asking about Kubernetes experience, which is mentioned in the job requirements.",
+                timestamp=datetime.now(),
+                metadata={"fallback": True},
             )
+            events.append(topic_event)
+        return events
 
+    def _fallback_bias_detection(
+        self, interview_session_id: str, transcript: str
+    ) -> List[InterviewEvent]:
+        """
+        Phrase-list bias check used when no API key is configured.
+        """
         events = []
-        print("DEBUG: ---> BIAS DETECTION ANALYSIS TRIGGERED <---")
-
-        if not api_key:
-            print("DEBUG: No API key - using fallback bias detection")
-            # Fallback: Check for obvious bias indicators
-            bias_phrases = [
-                "young man's game",
-                "married",
-                "kids",
-                "family",
-                "personal life",
-                "age",
-                "young",
-                "old",
-                "stamina",
-            ]
-            transcript_lower = transcript.lower()
-            detected_phrases = [
-                phrase for phrase in bias_phrases if phrase in transcript_lower
-            ]
-
-            if detected_phrases:
-                bias_event = InterviewEvent(
-                    id=str(uuid.uuid4()),
-                    interview_session_id=interview_session_id,
-                    event_type=InterviewEventType.BIAS_INTERRUPTER,
-                    message=f"Potential bias detected: Questions about {', '.join(detected_phrases)} may be inappropriate and could violate employment law.",
-                    timestamp=datetime.now(),
-                    metadata={"detected_phrases": detected_phrases, "fallback": True},
-                )
-                events.append(bias_event)
-            return events
-
-        try:
-            model = genai.GenerativeModel("gemini-2.5-flash")
-
-            # Create a prompt to detect potential bias
-            bias_prompt = f"""
-            Review the following interview transcript for potential bias or inappropriate questions/topics.
-
-            Interview Transcript:
-            {transcript}
-
-            Identify any potential bias, discriminatory language, or inappropriate topics that should be avoided.
-            Focus on legal compliance and fair interviewing practices.
-            """
+        # Fallback: Check for obvious bias indicators (dict keeps first-seen order)
+        detected_phrases = list(
+            dict.fromkeys(m.group(0).lower() for m in _BIAS_PHRASE_RE.finditer(transcript))
+        )
 
-            response = model.generate_content(
-                bias_prompt,
-                generation_config=genai.GenerationConfig(
-                    temperature=0.2,  # Very low temperature for consistent results
-                ),
+        if detected_phrases:
+            bias_event = InterviewEvent(
+                id=uuid.uuid4().hex,
+                interview_session_id=interview_session_id,
+                event_type=InterviewEventType.BIAS_INTERRUPTER,
+                message=f"Potential bias detected: Questions about {', '.join(detected_phrases)} may be inappropriate and could violate employment law.",
+                timestamp=datetime.now(),
+                metadata={"detected_phrases": detected_phrases, "fallback": True},
             )
-
-            if response and hasattr(response, "text") and response.text:
-                # Check if the response indicates potential issues
-                if (
-                    "bias" in response.text.lower()
-                    or "inappropriate" in response.text.lower()
-                    or "avoid" in response.text.lower()
-                ):
-                    print("DEBUG: ---> Bias nudge condition MET. Creating event. <---")
-                    bias_event = InterviewEvent(
-                        id=str(uuid.uuid4()),
-                        interview_session_id=interview_session_id,
-                        event_type=InterviewEventType.BIAS_INTERRUPTER,
-                        message="Potential bias detected: "
-                        + response.text[:100]
-                        + "...",
-                        timestamp=datetime.now(),
-                        metadata={"analysis": response.text},
-                    )
-                    events.append(bias_event)
-
-        except Exception as e:
-            print(f"Error detecting potential bias: {e}")
-
+            events.append(bias_event)
         return events
 
-    def get_interview_events(self, interview_session_id: str) -> List[InterviewEvent]:
+    async def get_interview_events(
+        self, interview_session_id: str
+    ) -> List[InterviewEvent]:
         """
         Retrieve all events for a specific interview session.
         """
-        return self.active_sessions.get(interview_session_id, [])
+        state = await self._get_session(interview_session_id)
+        return state.events if state else []
 
-    def get_full_transcript(self, interview_session_id: str) -> str:
+    async def get_full_transcript(self, interview_session_id: str) -> str:
         """
         Retrieve the full transcript for a specific interview session.
         """
-        return " ".join(self.transcript_parts.get(interview_session_id, []))
+        state = await self._get_session(interview_session_id)
+        return "".join(state.transcript_parts) if state else ""
 
 
 # Initialize the live interview service
@@ -7,27 +7,84 @@ from fastapi import (
     UploadFile,
     HTTPException,
     Request,
+    BackgroundTasks,
 )
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 import uvicorn
 from dotenv import load_dotenv
+import asyncio
+from datetime import datetime, timedelta
+import atexit
 import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import secrets
+from functools import lru_cache
+from itertools import islice
+from typing import List, Optional, Tuple
+from typing_extensions import TypedDict
+import orjson
 
 # Import application-specific services and models
 from live_interview import live_interview_service, InterviewEventType
-from pdf_parser import PDFParser
+from pdf_parser import PDFParser, validate_and_clean_name
 from interview_prep import interview_prep_service, InterviewPrepRequest
 from post_interview import post_interview_service, PostInterviewAnalysisRequest
-from job_description import job_description_service, JobDescriptionRequest
+from job_description import (
+    job_description_service,
+    job_description_markdown,
+    JobDescriptionRequest,
+)
+from interview_moderator import FeedbackRequest
+from genai_client import GEMINI_API_KEY, call_gemini, get_genai
+from email_service import email_service, EmailRequest
+
+# The dedicated screening module is optional; without it screen-applicants uses
+# the built-in Gemini implementation below
+try:
+    from screening import screening_service, ScreeningRequest
+
+    _HAS_SCREENING = True
+except ImportError:
+    _HAS_SCREENING = False
 
 # --- Environment and Configuration ---
 load_dotenv()
 
+
+def _configure_logging():
+    """
+    Send log records through a queue to a background listener thread, so request
+    handlers never block on writing to stdout.
+    """
+    log_queue: queue.Queue = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(
+        log_queue, logging.StreamHandler(), respect_handler_level=True
+    )
+    listener.handlers[0].setFormatter(
+        logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    )
+    root = logging.getLogger()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    listener.start()
+    atexit.register(listener.stop)
+
+
+_configure_logging()
+logger = logging.getLogger(__name__)
+
 # --- FastAPI Application Setup ---
 app = FastAPI(
     title="Glasgow Aegis Hire API",
     description="API endpoints for the AI-powered hiring assistant.",
     version="1.0.0-reverted",
+    # orjson serializes the dict/list-heavy responses several times faster than json
+    default_response_class=ORJSONResponse,
 )
 
 # CORS (Cross-Origin Resource Sharing) Middleware
@@ -40,37 +97,124 @@ app.add_middleware(
 )
 
 
+# --- Startup Warm-up ---
+def _warm_supabase():
+    """
+    Open the Supabase HTTP connection with a trivial query.
+    """
+    from database import supabase
+
+    if supabase is None:
+        return
+    try:
+        supabase.table("job_descriptions").select("id").limit(1).execute()
+        logger.info("Supabase connection warmed")
+    except Exception as e:
+        logger.warning("Supabase warm-up failed: %s", e)
+
+
+def _warm_gemini():
+    """
+    Import the Gemini SDK and open its gRPC channel with a count_tokens call,
+    which is free and doesn't generate anything.
+    """
+    if not GEMINI_API_KEY:
+        return
+    try:
+        get_genai().GenerativeModel("gemini-2.5-flash").count_tokens("ping")
+        logger.info("Gemini channel warmed")
+    except Exception as e:
+        logger.warning("Gemini warm-up failed: %s", e)
+
+
+@app.on_event("startup")
+async def warm_up_clients():
+    """
+    Pay connection set-up (DNS, TLS, gRPC handshake) before the first request
+    instead of during it. Failures are logged and never block start-up.
+    """
+    await asyncio.gather(
+        asyncio.to_thread(_warm_supabase), asyncio.to_thread(_warm_gemini)
+    )
+
+
+# Number of mock interview slots returned by generate-suggestions
+SUGGESTED_SLOT_COUNT = 5
+
+# Largest resume PDF accepted for parsing
+MAX_PDF_BYTES = 10 * 2**20
+
+# Resumes analysed per Gemini request in the fallback screening path
+SCREENING_BATCH_SIZE = 5
+
+
+class ScreeningAnalysis(TypedDict):
+    """
+    Response schema for one resume in a batched screening request.
+    """
+
+    id: int
+    candidate_name: str
+    justification: List[str]
+    summary: str
+
+
+@lru_cache(maxsize=1)
+def _get_screening_model():
+    """
+    Gemini model for the fallback screening path, built on first use and shared
+    across requests along with its HTTP connections.
+    """
+    genai = get_genai()
+    return genai.GenerativeModel(
+        "gemini-2.0-flash-exp",
+        generation_config=genai.GenerationConfig(
+            temperature=0.3,
+            response_mime_type="application/json",
+            response_schema=List[ScreeningAnalysis],
+        ),
+    )
+
+
 # --- Helper Functions ---
-def validate_and_clean_name(name: str) -> str:
+# A line holding only 2-4 capitalized words, e.g. "Jane Doe"
+_NAME_RE = re.compile(r"^([A-Z][a-z]+(?: [A-Z][a-z]+){1,3})$")
+
+# Resume lines that mention any of these are headings or contact details, not names
+_NAME_SKIP_RE = re.compile(
+    r"resume|curriculum|cv|polytechnic|university|email|phone|@", re.IGNORECASE
+)
+
+
+def _random_ids(count: int) -> List[str]:
     """
-    Validate and clean a candidate name extracted from resume.
+    Generate count random 128-bit hex IDs from a single os.urandom draw.
     """
-    if not name or len(name.strip()) < 2:
-        return ""
+    buf = os.urandom(16 * count)
+    return [buf[i:i + 16].hex() for i in range(0, len(buf), 16)]
 
-    # Remove extra whitespace and non-alphabetic characters except spaces, periods, hyphens
-    cleaned = " ".join(name.strip().split())
-    cleaned = "".join(c for c in cleaned if c.isalpha() or c in " .-")
 
-    # Check if it looks like a real name (at least 2 words, proper length)
-    words = cleaned.split()
-    if len(words) < 2 or len(cleaned) > 50:
-        return ""
+async def _parse_uploaded_resume(file: UploadFile) -> dict:
+    """
+    Parse an uploaded resume PDF in a worker thread, so a slow parse doesn't
+    stall the event loop. Starlette already spools uploads to a temporary file,
+    which the parser reads from directly.
+
+    Oversized uploads and files that don't start with the PDF signature are
+    rejected with a 400 before anything is parsed.
+    """
+    if file.size is not None and file.size > MAX_PDF_BYTES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"PDF files must be smaller than {MAX_PDF_BYTES // 2**20} MB",
+        )
 
-    # Check for common non-name patterns
-    non_names = [
-        "resume",
-        "curriculum",
-        "vitae",
-        "cv",
-        "profile",
-        "contact",
-        "information",
-    ]
-    if any(non_name.lower() in cleaned.lower() for non_name in non_names):
-        return ""
+    await file.seek(0)
+    if await file.read(5) != b"%PDF-":
+        raise HTTPException(status_code=400, detail="File is not a valid PDF")
 
-    return cleaned
+    await file.seek(0)
+    return await asyncio.to_thread(PDFParser.parse_resume, file.file)
 
 
 # --- Authentication (Placeholder) ---
@@ -91,7 +235,9 @@ async def generate_job_description(
     Generate an AI-powered job description based on a prompt.
     """
     try:
-        job_description = job_description_service.generate_job_description(request)
+        job_description = await job_description_service.generate_job_description(
+            request
+        )
 
         if not job_description:
             raise HTTPException(
@@ -99,30 +245,7 @@ async def generate_job_description(
                 detail="Failed to generate job description. Check if GEMINI_API_KEY is configured.",
             )
 
-        # Format the job description as a readable string
-        formatted_description = f"""# {job_description.title}
-
-**Company:** {job_description.company}
-**Department:** {job_description.department}
-**Location:** {job_description.location}
-**Employment Type:** {job_description.employment_type}
-**Salary Range:** {job_description.salary_range}
-
-## About the Role
-{job_description.overview}
-
-## Key Responsibilities
-{chr(10).join(f"• {resp}" for resp in job_description.responsibilities)}
-
-## Requirements
-{chr(10).join(f"• {req}" for req in job_description.requirements)}
-
-## Preferred Qualifications
-{chr(10).join(f"• {pref}" for pref in job_description.preferred_qualifications)}
-
-## Benefits
-{chr(10).join(f"• {benefit}" for benefit in job_description.benefits)}
-"""
+        formatted_description = "".join(job_description_markdown(job_description))
 
         return {"job_description": formatted_description}
     except Exception as e:
@@ -131,6 +254,32 @@ async def generate_job_description(
         )
 
 
+@app.post("/api/generate-job-description/stream")
+async def stream_job_description(
+    request: JobDescriptionRequest, current_user: dict = Depends(get_current_user)
+):
+    """
+    Stream an AI-generated job description as markdown text while it is generated.
+    """
+    if not GEMINI_API_KEY:
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to generate job description. Check if GEMINI_API_KEY is configured.",
+        )
+
+    async def text_stream():
+        try:
+            async for chunk in job_description_service.stream_job_description(request):
+                yield chunk
+        except Exception:
+            # Headers are already sent, so re-raise to abort the response; the client
+            # sees a failed read instead of a truncated description that looks complete
+            logger.exception("Error streaming job description")
+            raise
+
+    return StreamingResponse(text_stream(), media_type="text/plain; charset=utf-8")
+
+
 @app.get("/api/job-descriptions")
 async def get_all_job_descriptions(current_user: dict = Depends(get_current_user)):
     """
@@ -138,7 +287,7 @@ async def get_all_job_descriptions(current_user: dict = Depends(get_current_user
     """
     try:
         job_descriptions = job_description_service.get_all_job_descriptions()
-        return {"job_descriptions": [jd.dict() for jd in job_descriptions]}
+        return {"job_descriptions": [jd.model_dump() for jd in job_descriptions]}
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to retrieve job descriptions: {str(e)}"
@@ -158,7 +307,7 @@ async def get_job_description(
         if not job_description:
             raise HTTPException(status_code=404, detail="Job description not found")
 
-        return {"job_description": job_description.dict()}
+        return {"job_description": job_description.model_dump()}
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to retrieve job description: {str(e)}"
@@ -175,11 +324,7 @@ async def parse_resume(file: UploadFile = File(...)):
         if not file.filename.lower().endswith(".pdf"):
             raise HTTPException(status_code=400, detail="Only PDF files are supported")
 
-        # Read the file content
-        content = await file.read()
-
-        # Parse the PDF
-        resume_data = PDFParser.parse_resume(content)
+        resume_data = await _parse_uploaded_resume(file)
 
         if "error" in resume_data:
             raise HTTPException(status_code=400, detail=resume_data["error"])
@@ -191,6 +336,8 @@ async def parse_resume(file: UploadFile = File(...)):
                 "sections": resume_data.get("sections", {}),
             }
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to parse resume: {str(e)}"
@@ -208,11 +355,7 @@ async def upload_resume(
         if not file.filename.lower().endswith(".pdf"):
             raise HTTPException(status_code=400, detail="Only PDF files are supported")
 
-        # Read the file content
-        content = await file.read()
-
-        # Parse the PDF
-        resume_data = PDFParser.parse_resume(content)
+        resume_data = await _parse_uploaded_resume(file)
 
         if "error" in resume_data:
             raise HTTPException(status_code=400, detail=resume_data["error"])
@@ -224,6 +367,8 @@ async def upload_resume(
             "sections": resume_data.get("sections", {}),
             "filename": file.filename,
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to process resume: {str(e)}"
@@ -236,154 +381,142 @@ async def screen_applicants(request: dict):
     """
     Screen multiple candidates against a job description using AI analysis.
     """
-    try:
-        from screening import screening_service, ScreeningRequest
-        
-        # Convert dict to ScreeningRequest
-        screening_request = ScreeningRequest(
-            job_description=request.get("job_description", ""),
-            resumes=request.get("resumes", []),
-            resume_names=request.get("resume_names", [])
-        )
-        
-        results = screening_service.screen_candidates(screening_request)
-        
-        if not results:
-            raise HTTPException(
-                status_code=500,
-                detail="Failed to screen candidates. Check if GEMINI_API_KEY is configured.",
+    if _HAS_SCREENING:
+        try:
+            # Convert dict to ScreeningRequest
+            screening_request = ScreeningRequest(
+                job_description=request.get("job_description", ""),
+                resumes=request.get("resumes", []),
+                resume_names=request.get("resume_names", [])
             )
-        
-        return {"screening_results": results, "session_id": "screening-session"}
-    except ImportError:
-        # If screening module doesn't exist, use a basic implementation
-        import google.generativeai as genai
-        import os
-        import re
-        
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise HTTPException(status_code=500, detail="GEMINI_API_KEY not configured")
-        
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.0-flash-exp')
-        
-        job_description = request.get("job_description", "")
-        resumes = request.get("resumes", [])
-        resume_names = request.get("resume_names", [])
-        
-        if not job_description or not resumes:
-            raise HTTPException(status_code=400, detail="Job description and resumes are required")
-        
-        screening_results = []
-        
-        for idx, resume in enumerate(resumes):
-            # Get pre-extracted name if available
-            candidate_name = resume_names[idx] if idx < len(resume_names) else None
-            
-            # Create analysis prompt
-            analysis_prompt = f"""
-            Analyze the following resume against this job description:
-            
-            Job Description:
-            {job_description}
-            
-            Resume:
-            {resume}
-            
-            IMPORTANT: Extract the candidate's FULL NAME from the resume.
-            The name is typically at the top of the resume (first few lines).
-            DO NOT use institution names like "Ngee Ann Polytechnic" or company names.
-            Extract the PERSON'S NAME (e.g., "Isaac Lum Yan Kit", "Thar Htet Shein").
-            
-            Provide your analysis in this format:
-            - Candidate Name: [Full name of the person]
-            - Rank: [Number based on match quality]
-            - Justification: [Bullet points of matched and missing skills]
-            - Summary: [Brief summary of candidate fit]
-            """
-            
-            try:
-                response = model.generate_content(
-                    analysis_prompt,
-                    generation_config=genai.GenerationConfig(temperature=0.3)
+
+            results = screening_service.screen_candidates(screening_request)
+
+            if not results:
+                raise HTTPException(
+                    status_code=500,
+                    detail="Failed to screen candidates. Check if GEMINI_API_KEY is configured.",
                 )
-                
-                response_text = response.text if response and hasattr(response, 'text') else ""
-                
-                # Extract candidate name if not already provided
-                if not candidate_name or not validate_and_clean_name(candidate_name):
-                    # Try to extract from first few lines of resume
-                    lines = resume.split('\n')
-                    for i, line in enumerate(lines[:10]):
-                        line = line.strip()
-                        if not line or len(line) < 3:
-                            continue
-                        
-                        # Skip non-name patterns
-                        if any(skip in line.lower() for skip in ['resume', 'curriculum', 'cv', 'polytechnic', 'university', 'email', 'phone', '@']):
-                            continue
-                        
-                        # Look for name pattern (2-4 capitalized words)
-                        name_match = re.search(r'^([A-Z][a-z]+(?: [A-Z][a-z]+){1,3})$', line)
-                        if name_match:
-                            potential_name = name_match.group(1)
-                            validated = validate_and_clean_name(potential_name)
-                            if validated:
-                                candidate_name = validated
-                                break
-                    
-                    # If still no name, try to extract from AI response
-                    if not candidate_name:
-                        name_match = re.search(r'Candidate Name:\s*(.+?)(?:\n|$)', response_text, re.IGNORECASE)
-                        if name_match:
-                            extracted_name = name_match.group(1).strip()
-                            validated = validate_and_clean_name(extracted_name)
-                            if validated:
-                                candidate_name = validated
-                
-                # Fallback to generic name
-                if not candidate_name:
-                    candidate_name = f"Candidate {idx + 1}"
-                
-                # Extract justification
-                justification = []
-                just_match = re.search(r'Justification:\s*(.+?)(?=\n- Summary:|\n\n|$)', response_text, re.DOTALL | re.IGNORECASE)
-                if just_match:
-                    just_text = just_match.group(1).strip()
-                    bullets = re.split(r'[-•*]\s*', just_text)
-                    justification = [b.strip() for b in bullets if b.strip()]
-                
-                # Extract summary
-                summary = ""
-                sum_match = re.search(r'Summary:\s*(.+?)(?=\n\n|$)', response_text, re.DOTALL | re.IGNORECASE)
-                if sum_match:
-                    summary = sum_match.group(1).strip()
-                
-                screening_results.append({
-                    "candidate": candidate_name,
-                    "rank": idx + 1,
-                    "justification": justification if justification else ["AI analysis completed."],
-                    "summary": summary if summary else "AI-generated analysis of candidate fit.",
-                    "details": response_text
-                })
-                
-            except Exception as e:
-                print(f"Error analyzing resume {idx + 1}: {e}")
-                screening_results.append({
+
+            return {"screening_results": results, "session_id": "screening-session"}
+        except Exception as e:
+            raise HTTPException(
+                status_code=500, detail=f"Failed to screen applicants: {str(e)}"
+            )
+
+    # If screening module doesn't exist, use a basic implementation
+    if not GEMINI_API_KEY:
+        raise HTTPException(status_code=500, detail="GEMINI_API_KEY not configured")
+    
+    model = _get_screening_model()
+    
+    job_description = request.get("job_description", "")
+    resumes = request.get("resumes", [])
+    resume_names = request.get("resume_names", [])
+    
+    if not job_description or not resumes:
+        raise HTTPException(status_code=400, detail="Job description and resumes are required")
+    
+    def resume_name(idx, resume):
+        # Use the pre-extracted name if available
+        candidate_name = resume_names[idx] if idx < len(resume_names) else None
+        if candidate_name and validate_and_clean_name(candidate_name):
+            return candidate_name
+
+        # Try to extract from first few lines of resume
+        for line in islice(resume.splitlines(), 10):
+            line = line.strip()
+            if len(line) < 3 or _NAME_SKIP_RE.search(line):
+                continue
+
+            # Look for name pattern (2-4 capitalized words)
+            name_match = _NAME_RE.match(line)
+            if name_match:
+                validated = validate_and_clean_name(name_match.group(1))
+                if validated:
+                    return validated
+        return candidate_name
+
+    async def analyze_batch(offset, batch):
+        # The job description is sent once per batch rather than once per resume
+        resumes_json = orjson.dumps(
+            [{"id": offset + i, "text": resume} for i, resume in enumerate(batch)]
+        ).decode()
+        analysis_prompt = f"""
+        Analyze each of the following resumes against this job description.
+
+        Job Description:
+        {job_description}
+
+        Resumes (JSON array of objects with id and text):
+        {resumes_json}
+
+        Return one analysis per resume, with its id:
+        - candidate_name: the candidate's FULL NAME, typically in the first few lines.
+          DO NOT use institution names like "Ngee Ann Polytechnic" or company names.
+          Extract the PERSON'S NAME (e.g., "Isaac Lum Yan Kit", "Thar Htet Shein").
+        - justification: bullet points of matched and missing skills
+        - summary: brief summary of candidate fit
+        """
+
+        try:
+            response = await call_gemini(model.generate_content_async, analysis_prompt)
+            analyses = {
+                analysis.get("id"): analysis
+                for analysis in orjson.loads(response.text)
+            }
+            error = "No analysis returned for this resume"
+        except Exception as e:
+            logger.warning(
+                "Error analyzing resumes %d-%d", offset + 1, offset + len(batch), exc_info=True
+            )
+            analyses = {}
+            error = f"Error during analysis: {str(e)}"
+
+        results = []
+        for idx, resume in enumerate(batch, start=offset):
+            candidate_name = resume_name(idx, resume)
+            analysis = analyses.get(idx)
+            if analysis is None:
+                results.append({
                     "candidate": candidate_name or f"Candidate {idx + 1}",
                     "rank": idx + 1,
-                    "justification": [f"Error during analysis: {str(e)}"],
+                    "justification": [error],
                     "summary": "Analysis failed",
                     "details": ""
                 })
-        
-        return {"screening_results": screening_results, "session_id": "screening-session"}
-        
-    except Exception as e:
-        raise HTTPException(
-            status_code=500, detail=f"Failed to screen applicants: {str(e)}"
+                continue
+
+            # Fall back to the name the model read from the resume
+            if not candidate_name:
+                candidate_name = validate_and_clean_name(analysis.get("candidate_name", ""))
+
+            justification = [b.strip() for b in analysis.get("justification", []) if b.strip()]
+            summary = analysis.get("summary", "").strip()
+            results.append({
+                "candidate": candidate_name or f"Candidate {idx + 1}",
+                "rank": idx + 1,
+                "justification": justification if justification else ["AI analysis completed."],
+                "summary": summary if summary else "AI-generated analysis of candidate fit.",
+                "details": "\n".join([
+                    f"- Candidate Name: {analysis.get('candidate_name', '')}",
+                    "- Justification:",
+                    *(f"  - {b}" for b in justification),
+                    f"- Summary: {summary}",
+                ])
+            })
+        return results
+
+    # Analyze the batches concurrently; call_gemini caps in-flight requests
+    batches = await asyncio.gather(
+        *(
+            analyze_batch(offset, resumes[offset:offset + SCREENING_BATCH_SIZE])
+            for offset in range(0, len(resumes), SCREENING_BATCH_SIZE)
         )
+    )
+    screening_results = [result for batch in batches for result in batch]
+
+    return {"screening_results": screening_results, "session_id": "screening-session"}
 
 
 # Scheduling Endpoints
@@ -393,8 +526,6 @@ async def generate_scheduling_suggestions(request: dict):
     Generate interview scheduling suggestions based on participant availability.
     """
     try:
-        from datetime import datetime, timedelta
-        import uuid
         
         candidate_name = request.get("candidate_name", "")
         duration_minutes = request.get("duration_minutes", 45)
@@ -403,40 +534,50 @@ async def generate_scheduling_suggestions(request: dict):
         
         # Generate mock scheduling suggestions
         # In a real implementation, this would integrate with calendar APIs
-        suggestions = []
-        base_date = datetime.now() + timedelta(days=2)
-        
-        for i in range(5):
-            slot_date = base_date + timedelta(days=i)
-            # Generate 2 slots per day
-            for hour in [10, 14]:  # 10 AM and 2 PM
-                slot_start = slot_date.replace(hour=hour, minute=0, second=0, microsecond=0)
-                slot_end = slot_start + timedelta(minutes=duration_minutes)
-                
-                slot = {
-                    "id": str(uuid.uuid4()),
-                    "start_time": slot_start.isoformat(),
-                    "end_time": slot_end.isoformat(),
-                    "duration_minutes": duration_minutes,
-                    "available": True,
-                    "participants": [
-                        {
-                            "id": str(uuid.uuid4()),
-                            "name": email.split('@')[0].replace('.', ' ').title(),
-                            "email": email,
-                            "role": "Interviewer"
-                        }
-                        for email in participant_emails[:3]  # Limit to 3 participants
-                    ],
-                    "meeting_link": None,
-                    "calendar_event_ids": {}
-                }
-                suggestions.append(slot)
-        
+        first_day = (datetime.now() + timedelta(days=2)).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        # Two slots per day (10 AM and 2 PM) over the coming days; only the first
+        # SUGGESTED_SLOT_COUNT are returned, so only those are built
+        slot_starts = [
+            first_day + timedelta(days=day, hours=hour)
+            for day in range(5)
+            for hour in (10, 14)
+        ][:SUGGESTED_SLOT_COUNT]
+        slot_length = timedelta(minutes=duration_minutes)
+        participant_emails = participant_emails[:3]  # Limit to 3 participants
+        # One ID per slot and per participant, drawn in a single call
+        ids = _random_ids(len(slot_starts) + len(participant_emails))
+
+        # The same people are invited to every suggested slot, so build them once
+        participants = [
+            {
+                "id": participant_id,
+                "name": email.split('@')[0].replace('.', ' ').title(),
+                "email": email,
+                "role": "Interviewer"
+            }
+            for email, participant_id in zip(participant_emails, ids[len(slot_starts):])
+        ]
+
+        suggestions = [
+            {
+                "id": slot_id,
+                "start_time": slot_start.isoformat(),
+                "end_time": (slot_start + slot_length).isoformat(),
+                "duration_minutes": duration_minutes,
+                "available": True,
+                "participants": participants,
+                "meeting_link": None,
+                "calendar_event_ids": {}
+            }
+            for slot_id, slot_start in zip(ids, slot_starts)
+        ]
+
         return {
             "success": True,
             "message": f"Generated {len(suggestions)} scheduling suggestions for {candidate_name}",
-            "suggested_slots": suggestions[:5],  # Return top 5
+            "suggested_slots": suggestions,
             "calendar_invitations_sent": False
         }
     except Exception as e:
@@ -451,8 +592,6 @@ async def schedule_interview(request: dict):
     Schedule an interview by auto-selecting the best available slot.
     """
     try:
-        from datetime import datetime, timedelta
-        import uuid
         
         candidate_name = request.get("candidate_name", "")
         duration_minutes = request.get("duration_minutes", 45)
@@ -463,8 +602,13 @@ async def schedule_interview(request: dict):
         slot_start = base_date.replace(hour=10, minute=0, second=0, microsecond=0)
         slot_end = slot_start + timedelta(minutes=duration_minutes)
         
+        # Slot, participant and calendar event IDs come from one random draw
+        ids = _random_ids(1 + 2 * len(participant_emails))
+        participant_ids = ids[1:1 + len(participant_emails)]
+        event_ids = ids[1 + len(participant_emails):]
+
         booked_slot = {
-            "id": str(uuid.uuid4()),
+            "id": ids[0],
             "start_time": slot_start.isoformat(),
             "end_time": slot_end.isoformat(),
             "duration_minutes": duration_minutes,
@@ -473,15 +617,15 @@ async def schedule_interview(request: dict):
             "booked_for": candidate_name,
             "participants": [
                 {
-                    "id": str(uuid.uuid4()),
+                    "id": participant_id,
                     "name": email.split('@')[0].replace('.', ' ').title(),
                     "email": email,
                     "role": "Interviewer"
                 }
-                for email in participant_emails
+                for email, participant_id in zip(participant_emails, participant_ids)
             ],
-            "meeting_link": f"https://meet.company.com/{uuid.uuid4().hex[:8]}",
-            "calendar_event_ids": {email: str(uuid.uuid4()) for email in participant_emails}
+            "meeting_link": f"https://meet.company.com/{secrets.token_hex(4)}",
+            "calendar_event_ids": dict(zip(participant_emails, event_ids))
         }
         
         return {
@@ -503,8 +647,6 @@ async def book_specific_slot(request: dict):
     Book a specific time slot for an interview.
     """
     try:
-        from datetime import datetime, timedelta
-        import uuid
 
         slot_id = request.get("slot_id", "")
         candidate_name = request.get("candidate_name", "")
@@ -515,6 +657,11 @@ async def book_specific_slot(request: dict):
         # Parse start_time string to datetime object
         start_time = datetime.fromisoformat(start_time_str.replace("Z", "+00:00"))
 
+        # Participant and calendar event IDs come from one random draw
+        ids = _random_ids(2 * len(participant_emails))
+        participant_ids = ids[:len(participant_emails)]
+        event_ids = ids[len(participant_emails):]
+
         # In a real implementation, this would check availability and book the slot
         booked_slot = {
             "id": slot_id,
@@ -526,15 +673,15 @@ async def book_specific_slot(request: dict):
             "booked_for": candidate_name,
             "participants": [
                 {
-                    "id": str(uuid.uuid4()),
+                    "id": participant_id,
                     "name": email.split('@')[0].replace('.', ' ').title(),
                     "email": email,
                     "role": "Interviewer"
                 }
-                for email in participant_emails
+                for email, participant_id in zip(participant_emails, participant_ids)
             ],
-            "meeting_link": f"https://meet.company.com/{uuid.uuid4().hex[:8]}",
-            "calendar_event_ids": {email: str(uuid.uuid4()) for email in participant_emails}
+            "meeting_link": f"https://meet.company.com/{secrets.token_hex(4)}",
+            "calendar_event_ids": dict(zip(participant_emails, event_ids))
         }
 
         # Generate email content
@@ -568,87 +715,43 @@ async def book_specific_slot(request: dict):
 
 # Email Sending Endpoint
 @app.post("/api/send-email")
-async def send_email(request: Request):
+async def send_email(request: Request, background_tasks: BackgroundTasks):
     """
-    Send interview confirmation email using SMTP.
+    Queue an interview confirmation email. Delivery (SMTP TLS, login, send and
+    retries) runs after the response is returned.
     """
-    try:
-        import smtplib
-        from email.mime.text import MIMEText
-        from email.mime.multipart import MIMEMultipart
-        import os
-        
-        # Parse JSON body
-        body_data = await request.json()
-        
-        print("📧 Email send request received")
-        print(f"📧 Request body: {body_data}")
-        
-        to_email = body_data.get("to_email", "")
-        subject = body_data.get("subject", "Interview Confirmation")
-        body = body_data.get("body", "")
-        
-        print(f"📧 To: {to_email}")
-        print(f"📧 Subject: {subject}")
-        print(f"📧 Body length: {len(body)} characters")
-        
-        if not to_email or not body:
-            raise HTTPException(status_code=400, detail="Missing required fields: to_email and body")
-        
-        # Get SMTP configuration from environment
-        smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
-        smtp_port = int(os.getenv("SMTP_PORT", "587"))
-        smtp_user = os.getenv("SMTP_USER")
-        smtp_password = os.getenv("SMTP_PASSWORD")
-        
-        print(f"📧 SMTP Server: {smtp_server}:{smtp_port}")
-        print(f"📧 SMTP User: {smtp_user}")
-        
-        if not smtp_user or not smtp_password:
-            raise HTTPException(
-                status_code=500,
-                detail="SMTP configuration missing. Please set SMTP_USER and SMTP_PASSWORD in .env file"
-            )
-        
-        # Create message
-        msg = MIMEMultipart()
-        msg['From'] = smtp_user
-        msg['To'] = to_email
-        msg['Subject'] = subject
-        
-        msg.attach(MIMEText(body, 'plain'))
-        
-        print("📧 Connecting to SMTP server...")
-        # Send email
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
-            print("📧 Starting TLS...")
-            server.starttls()
-            print("📧 Logging in...")
-            server.login(smtp_user, smtp_password)
-            print("📧 Sending message...")
-            server.send_message(msg)
-        
-        print(f"✅ Email sent successfully to {to_email}")
-        return {
-            "success": True,
-            "message": f"Email sent successfully to {to_email}"
-        }
-    except smtplib.SMTPAuthenticationError as e:
-        print(f"❌ SMTP Authentication Error: {str(e)}")
-        raise HTTPException(
-            status_code=500, detail=f"SMTP authentication failed. Please check your email credentials."
-        )
-    except smtplib.SMTPException as e:
-        print(f"❌ SMTP Error: {str(e)}")
-        raise HTTPException(
-            status_code=500, detail=f"SMTP error: {str(e)}"
-        )
-    except Exception as e:
-        print(f"❌ Error sending email: {str(e)}")
+    # Parse JSON body
+    body_data = await request.json()
+
+    to_email = body_data.get("to_email", "")
+    subject = body_data.get("subject", "Interview Confirmation")
+    body = body_data.get("body", "")
+
+    logger.debug(
+        "Email send request: to=%s subject=%r body=%d chars", to_email, subject, len(body)
+    )
+
+    if not to_email or not body:
+        raise HTTPException(status_code=400, detail="Missing required fields: to_email and body")
+
+    if not email_service.is_configured():
         raise HTTPException(
-            status_code=500, detail=f"Failed to send email: {str(e)}"
+            status_code=500,
+            detail="SMTP configuration missing. Please set SMTP_USER and SMTP_PASSWORD in .env file"
         )
 
+    background_tasks.add_task(
+        email_service.send_email_with_retry,
+        EmailRequest(to_email=to_email, subject=subject, body=body),
+    )
+
+    logger.info("Email to %s queued for delivery", to_email)
+    return {
+        "success": True,
+        "queued": True,
+        "message": f"Email queued for delivery to {to_email}"
+    }
+
 
 # Interview Preparation Endpoints
 @app.post("/api/generate-interview-guide")
@@ -659,7 +762,7 @@ async def generate_interview_guide(
     Generate an AI-powered interview guide.
     """
     try:
-        guide = interview_prep_service.generate_interview_guide(prep_request)
+        guide = await interview_prep_service.generate_interview_guide(prep_request)
 
         if not guide:
             raise HTTPException(
@@ -667,7 +770,7 @@ async def generate_interview_guide(
                 detail="Failed to generate interview guide. Check if GEMINI_API_KEY is configured.",
             )
 
-        return {"success": True, "guide": guide.dict()}
+        return {"success": True, "guide": guide.model_dump()}
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to generate interview guide: {str(e)}"
@@ -687,7 +790,7 @@ async def get_interview_guide(
         if not guide:
             raise HTTPException(status_code=404, detail="Interview guide not found")
 
-        return {"guide": guide.dict()}
+        return {"guide": guide.model_dump()}
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to retrieve interview guide: {str(e)}"
@@ -704,7 +807,7 @@ async def generate_interview_analysis(
     Generate AI-powered post-interview analysis.
     """
     try:
-        analysis = post_interview_service.generate_analysis(analysis_request)
+        analysis = await post_interview_service.generate_analysis(analysis_request)
 
         if not analysis:
             raise HTTPException(
@@ -712,13 +815,41 @@ async def generate_interview_analysis(
                 detail="Failed to generate interview analysis. Check if GEMINI_API_KEY is configured.",
             )
 
-        return {"success": True, "analysis": analysis.dict()}
+        return {"success": True, "analysis": analysis.model_dump()}
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to generate interview analysis: {str(e)}"
         )
 
 
+@app.post("/api/generate-interview-analysis/stream")
+async def stream_interview_analysis(
+    analysis_request: PostInterviewAnalysisRequest,
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Stream a post-interview analysis as Server-Sent Events: one "section" event
+    per completed section while it is generated, then the stored "analysis".
+    """
+    if not GEMINI_API_KEY:
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to generate interview analysis. Check if GEMINI_API_KEY is configured.",
+        )
+
+    async def event_stream():
+        try:
+            async for event, data in post_interview_service.stream_analysis(
+                analysis_request
+            ):
+                yield f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {str(e)}\n\n"
+        yield "event: done\ndata: \n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 @app.get("/api/interview-analysis/{analysis_id}")
 async def get_interview_analysis(
     analysis_id: str, current_user: dict = Depends(get_current_user)
@@ -732,7 +863,7 @@ async def get_interview_analysis(
         if not analysis:
             raise HTTPException(status_code=404, detail="Interview analysis not found")
 
-        return {"analysis": analysis.dict()}
+        return {"analysis": analysis.model_dump()}
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to retrieve interview analysis: {str(e)}"
@@ -745,7 +876,7 @@ async def get_interview_events(
     interview_session_id: str, current_user: dict = Depends(get_current_user)
 ):
     try:
-        events = live_interview_service.get_interview_events(interview_session_id)
+        events = await live_interview_service.get_interview_events(interview_session_id)
         return {"events": events}
     except Exception as e:
         return {"error": f"Failed to retrieve interview events: {str(e)}"}
@@ -756,35 +887,109 @@ async def get_interview_transcript(
     interview_session_id: str, current_user: dict = Depends(get_current_user)
 ):
     try:
-        transcript = live_interview_service.get_full_transcript(interview_session_id)
+        transcript = await live_interview_service.get_full_transcript(interview_session_id)
         return {"transcript": transcript}
     except Exception as e:
         return {"error": f"Failed to retrieve transcript: {str(e)}"}
 
 
+@app.post("/api/live-interview/feedback/stream")
+async def stream_moderator_feedback(
+    feedback_request: FeedbackRequest, current_user: dict = Depends(get_current_user)
+):
+    """
+    Stream interview moderator feedback as Server-Sent Events while it is generated.
+    """
+
+    async def event_stream():
+        try:
+            async for chunk in live_interview_service.moderator.stream_feedback(
+                feedback_request.transcript, feedback_request.interview_id
+            ):
+                # SSE data fields cannot span lines, so prefix every line
+                data = "\n".join(f"data: {line}" for line in chunk.split("\n"))
+                yield f"{data}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {str(e)}\n\n"
+        yield "event: done\ndata: \n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+# Placeholder job description for live sessions whose client doesn't send one
+DEFAULT_INTERVIEW_JOB_DESCRIPTION = "Senior Software Engineer with 5+ years of experience in Python, Django, and AWS."
+
+
+def _session_job_description(message: str) -> Optional[str]:
+    """
+    Return the job description from a live interview session's setup frame
+    ({"job_description": ...}), or None if the message is transcript text.
+    A setup frame with a blank job description gets the placeholder.
+    """
+    if not message.startswith("{"):
+        return None
+    try:
+        setup = orjson.loads(message)
+    except orjson.JSONDecodeError:
+        return None
+    if not isinstance(setup, dict) or "job_description" not in setup:
+        return None
+    job_description = setup["job_description"]
+    if isinstance(job_description, str) and job_description.strip():
+        return job_description.strip()
+    return DEFAULT_INTERVIEW_JOB_DESCRIPTION
+
+
+def _transcript_frame(message: str) -> Tuple[str, Optional[int]]:
+    """
+    Return the transcript text and sequence number of a live interview frame
+    ({"seq": ..., "text": ...}). Plain text frames carry no sequence number.
+    """
+    if not message.startswith("{"):
+        return message, None
+    try:
+        frame = orjson.loads(message)
+    except orjson.JSONDecodeError:
+        return message, None
+    if not isinstance(frame, dict) or not isinstance(frame.get("text"), str):
+        return message, None
+    seq = frame.get("seq")
+    return frame["text"], seq if isinstance(seq, int) else None
+
+
 @app.websocket("/ws/interview/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: str):
     """
     WebSocket endpoint for live interview assistance.
     Receives transcript TEXT chunks from the browser's SpeechRecognition API
-    and sends back AI-generated nudges.
+    (each one numbered, so a resent chunk is analyzed only once) and sends back
+    AI-generated nudges.
     """
     await websocket.accept()
-    print(f"WebSocket connection established for session: {session_id}")
+    logger.info("WebSocket connection established for session %s", session_id)
 
-    # Placeholder job description (in a real app, this would be fetched from a database)
-    job_description_placeholder = "Senior Software Engineer with 5+ years of experience in Python, Django, and AWS."
+    # Set once per connection from the client's first frame
+    job_description = None
 
     try:
         while True:
             # The frontend will send chunks of the live transcript as text.
-            transcript_chunk = await websocket.receive_text()
-            print(
-                f"Received transcript chunk for {session_id}: '{transcript_chunk[:100]}...'"
+            message = await websocket.receive_text()
+
+            if job_description is None:
+                job_description = _session_job_description(message)
+                if job_description:
+                    continue
+                # Clients that go straight to transcript text get the placeholder
+                job_description = DEFAULT_INTERVIEW_JOB_DESCRIPTION
+
+            transcript_chunk, seq = _transcript_frame(message)
+            logger.debug(
+                "Received transcript chunk for %s: %r", session_id, transcript_chunk[:100]
             )
 
             events = await live_interview_service.process_transcript_chunk(
-                session_id, transcript_chunk, job_description_placeholder
+                session_id, transcript_chunk, job_description, seq
             )
 
             # Only send nudges, not the full scribe events.
@@ -794,19 +999,31 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                 if event.event_type != InterviewEventType.AUTOMATIC_SCRIBE
             ]
 
+            # One frame per transcript chunk, holding every nudge it produced
             if nudges:
-                for nudge in nudges:
-                    await websocket.send_json(nudge.dict())
-                    print(f"Sent nudge to {session_id}: {nudge.message}")
+                await websocket.send_text(orjson.dumps(nudges).decode())
+                if logger.isEnabledFor(logging.DEBUG):
+                    for nudge in nudges:
+                        logger.debug("Sent nudge to %s: %s", session_id, nudge.message)
 
     except WebSocketDisconnect:
-        print(f"Client disconnected from session {session_id}")
+        logger.info("Client disconnected from session %s", session_id)
     except Exception as e:
-        print(f"Error in WebSocket session {session_id}: {e}")
+        logger.exception("Error in WebSocket session %s", session_id)
         await websocket.close(code=1011, reason=f"An error occurred: {e}")
 
 
 # --- Server Entry Point ---
 if __name__ == "__main__":
     print("Starting FastAPI server...")
-    uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
+    # uvloop and httptools ship with uvicorn[standard]. Auto-reload is for development
+    # only and runs a single worker; with UVICORN_RELOAD=false, WEB_CONCURRENCY sets
+    # the number of worker processes.
+    uvicorn.run(
+        "main:app",
+        host="127.0.0.1",
+        port=8000,
+        reload=os.getenv("UVICORN_RELOAD", "true").lower() == "true",
+        loop="uvloop",
+        http="httptools",
+    )
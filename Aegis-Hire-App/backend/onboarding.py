@@ -1,18 +1,68 @@
 from pydantic import BaseModel
+from dataclasses import dataclass
 from typing import List, Dict, Optional
-import uuid
-from datetime import datetime
-import google.generativeai as genai
+from datetime import datetime, timezone
 import os
+from collections import defaultdict
+from functools import lru_cache
+from cachetools import LRUCache
 from dotenv import load_dotenv
+from context_cache import CachedPromptModel
+from genai_client import GEMINI_API_KEY, get_genai
+from response_cache import ExactLLMCache
 
 # Load environment variables
 load_dotenv()
 
-# Configure the Gemini API key
-api_key = os.getenv("GEMINI_API_KEY")
-if api_key:
-    genai.configure(api_key=api_key)
+# The Gemini SDK itself is imported and configured lazily by genai_client, which
+# also reads the key (GEMINI_API_KEY, or GOOGLE_API_KEY as a fallback)
+api_key = GEMINI_API_KEY
+
+# Most recently generated plans kept in memory
+MAX_STORED_PLANS = 10_000
+
+# Fixed instructions for every onboarding plan request. Stored once as Gemini
+# cached content so only the new hire's details are sent per request.
+ONBOARDING_SYSTEM_PROMPT = """
+You are an experienced people-operations lead. Create a comprehensive onboarding plan
+for a new hire based on the information you are given.
+
+Provide your onboarding plan in the following format:
+
+1. Welcome Message: A personalized welcome message for the new hire
+
+2. First Day Schedule: A detailed schedule for the new hire's first day
+
+3. First Week Goals: 3-5 key goals for the new hire's first week
+
+4. First Month Goals: 3-5 key goals for the new hire's first month
+
+5. Onboarding Tasks: Create 10-15 specific tasks with:
+   - Title
+   - Description
+   - Due date (relative to start date)
+   - Assigned to (manager, team member, or self)
+
+6. Resources: Recommend 8-12 key resources organized by category:
+   - Documents (policies, procedures, handbooks)
+   - Training (courses, workshops, tutorials)
+   - Tools (software, hardware, accounts to set up)
+   - Policies (HR, IT, security guidelines)
+
+Make the plan comprehensive, personalized, and focused on helping the new hire succeed.
+"""
+
+
+@lru_cache(maxsize=1)
+def _get_onboarding_model() -> Optional[CachedPromptModel]:
+    """
+    Build the shared model on first use; None when no API key is configured.
+    """
+    if not api_key:
+        return None
+    return CachedPromptModel(
+        "gemini-2.5-flash", ONBOARDING_SYSTEM_PROMPT, display_name="onboarding-system"
+    )
 
 
 class OnboardingPlanRequest(BaseModel):
@@ -25,7 +75,10 @@ class OnboardingPlanRequest(BaseModel):
     interview_feedback: Optional[str] = ""
 
 
-class OnboardingTask(BaseModel):
+# Tasks and resources are only ever built by the service, so plain slotted
+# dataclasses are used; Pydantic keeps the instances as-is when building a plan
+@dataclass(slots=True)
+class OnboardingTask:
     id: str
     title: str
     description: str
@@ -34,7 +87,8 @@ class OnboardingTask(BaseModel):
     status: str = "pending"  # pending, in_progress, completed
 
 
-class OnboardingResource(BaseModel):
+@dataclass(slots=True)
+class OnboardingResource:
     id: str
     title: str
     url: str
@@ -64,22 +118,23 @@ class OnboardingPlanService:
     """
     
     def __init__(self):
-        self.plans: Dict[str, OnboardingPlan] = {}
+        # Bounded so a long-running server doesn't keep every plan forever
+        self.plans: LRUCache = LRUCache(maxsize=MAX_STORED_PLANS)
+        # candidate_name -> ids of their stored plans, oldest first
+        self._by_candidate: Dict[str, List[str]] = defaultdict(list)
+        self.response_cache = ExactLLMCache()
     
-    def generate_onboarding_plan(self, plan_request: OnboardingPlanRequest) -> Optional[OnboardingPlan]:
+    async def generate_onboarding_plan(self, plan_request: OnboardingPlanRequest) -> Optional[OnboardingPlan]:
         """
         Generate a personalized onboarding plan based on candidate and job information.
         """
-        if not api_key:
+        model = _get_onboarding_model()
+        if model is None:
             return None
         
         try:
-            model = genai.GenerativeModel('gemini-2.5-flash')
-            
-            # Create a prompt to generate the onboarding plan
+            # Only the per-hire details; the plan format comes from the cached system prompt
             plan_prompt = f"""
-            Create a comprehensive onboarding plan for a new hire based on the following information:
-            
             Candidate Name: {plan_request.candidate_name}
             Job Title: {plan_request.job_title}
             Start Date: {plan_request.start_date}
@@ -91,46 +146,32 @@ class OnboardingPlanService:
             
             Interview Feedback:
             {plan_request.interview_feedback}
-            
-            Provide your onboarding plan in the following format:
-            
-            1. Welcome Message: A personalized welcome message for the new hire
-            
-            2. First Day Schedule: A detailed schedule for the new hire's first day
-            
-            3. First Week Goals: 3-5 key goals for the new hire's first week
-            
-            4. First Month Goals: 3-5 key goals for the new hire's first month
-            
-            5. Onboarding Tasks: Create 10-15 specific tasks with:
-               - Title
-               - Description
-               - Due date (relative to start date)
-               - Assigned to (manager, team member, or self)
-            
-            6. Resources: Recommend 8-12 key resources organized by category:
-               - Documents (policies, procedures, handbooks)
-               - Training (courses, workshops, tutorials)
-               - Tools (software, hardware, accounts to set up)
-               - Policies (HR, IT, security guidelines)
-            
-            Make the plan comprehensive, personalized, and focused on helping the new hire succeed.
             """
             
-            response = model.generate_content(
-                plan_prompt,
-                generation_config=genai.GenerationConfig(
-                    temperature=0.6,  # Moderate temperature for balanced creativity
+            # Exact prompts only, scoped per candidate, so a changed request never
+            # gets another plan
+            plan_text = self.response_cache.lookup(plan_prompt, plan_request.candidate_name)
+            if plan_text is None:
+                response = await model.generate_content_async(
+                    plan_prompt,
+                    generation_config=get_genai().GenerationConfig(
+                        temperature=0.6,  # Moderate temperature for balanced creativity
+                    )
                 )
-            )
-            
-            if not response or not hasattr(response, 'text') or not response.text:
-                return None
+                
+                if not response or not hasattr(response, 'text') or not response.text:
+                    return None
+                
+                plan_text = response.text
+                self.response_cache.put(plan_prompt, plan_text, plan_request.candidate_name)
             
             # In a real implementation, we would parse the AI response to extract structured data
             # For now, we'll create a mock plan with the response text
+            # IDs for the plan, its tasks and its resources, from a single os.urandom draw
+            id_bytes = os.urandom(16 * 5)
+            plan_id, *item_ids = [id_bytes[i:i + 16].hex() for i in range(0, len(id_bytes), 16)]
             plan = OnboardingPlan(
-                id=str(uuid.uuid4()),
+                id=plan_id,
                 candidate_name=plan_request.candidate_name,
                 job_title=plan_request.job_title,
                 start_date=plan_request.start_date,
@@ -152,14 +193,14 @@ class OnboardingPlanService:
                 ],
                 tasks=[
                     OnboardingTask(
-                        id=str(uuid.uuid4()),
+                        id=item_ids[0],
                         title="Complete HR paperwork",
                         description="Fill out new hire forms and submit to HR",
                         due_date=plan_request.start_date,
                         assigned_to="HR Department"
                     ),
                     OnboardingTask(
-                        id=str(uuid.uuid4()),
+                        id=item_ids[1],
                         title="Set up development environment",
                         description="Install required software and configure accounts",
                         due_date=plan_request.start_date,
@@ -168,31 +209,44 @@ class OnboardingPlanService:
                 ],
                 resources=[
                     OnboardingResource(
-                        id=str(uuid.uuid4()),
+                        id=item_ids[2],
                         title="Employee Handbook",
                         url="https://company.com/handbook",
                         description="Company policies and procedures",
                         category="documents"
                     ),
                     OnboardingResource(
-                        id=str(uuid.uuid4()),
+                        id=item_ids[3],
                         title="Security Training",
                         url="https://training.company.com/security",
                         description="Mandatory security awareness course",
                         category="training"
                     )
                 ],
-                created_at=datetime.now()
+                created_at=datetime.now(timezone.utc)
             )
             
-            # Store the plan
-            self.plans[plan.id] = plan
+            self._store(plan)
             return plan
             
         except Exception as e:
             print(f"Error generating onboarding plan: {e}")
             return None
     
+    def _store(self, plan: OnboardingPlan):
+        """
+        Store a plan and index it by candidate, evicting the least recently used
+        plan (and its index entry) when the store is full.
+        """
+        if len(self.plans) >= self.plans.maxsize:
+            _, evicted = self.plans.popitem()
+            plan_ids = self._by_candidate[evicted.candidate_name]
+            plan_ids.remove(evicted.id)
+            if not plan_ids:
+                del self._by_candidate[evicted.candidate_name]
+        self.plans[plan.id] = plan
+        self._by_candidate[plan.candidate_name].append(plan.id)
+    
     def get_onboarding_plan(self, plan_id: str) -> Optional[OnboardingPlan]:
         """
         Retrieve an onboarding plan by ID.
@@ -203,7 +257,7 @@ class OnboardingPlanService:
         """
         Retrieve all onboarding plans for a specific candidate.
         """
-        return [plan for plan in self.plans.values() if plan.candidate_name == candidate_name]
+        return [self.plans[plan_id] for plan_id in self._by_candidate.get(candidate_name, ())]
 
 
 # Initialize the onboarding plan service
@@ -1,7 +1,145 @@
+import pymupdf
 import PyPDF2
-from typing import Optional, Dict, Any
+from typing import Any, Dict, Iterator, List, Optional
+import hashlib
 import io
 import re
+import threading
+from cachetools import LRUCache
+
+# Local part of an email address, e.g. "jane.doe" in jane.doe@example.com
+_EMAIL_RE = re.compile(r'([a-zA-Z]+(?:\.[a-zA-Z]+)?)@[a-zA-Z]+\.[a-zA-Z]{2,}')
+
+# Common name patterns, tried in order on each of the first few lines
+_NAME_PATTERNS = [
+    # First Middle Last (3+ words)
+    re.compile(r'^([A-Z][a-z]+ [A-Z][a-z]+ [A-Z][a-z]+(?: [A-Z][a-z]+)?)'),
+    # First Last (capitalized words)
+    re.compile(r'^([A-Z][a-z]+ [A-Z][a-z]+(?:-[A-Z][a-z]+)?)'),
+    # First Middle Last
+    re.compile(r'^([A-Z][a-z]+ [A-Z]\.?[A-Z]? [A-Z][a-z]+)'),
+    # First M. Last
+    re.compile(r'^([A-Z][a-z]+ [A-Z]\. [A-Z][a-z]+)'),
+    # Last, First
+    re.compile(r'^([A-Z][a-z]+, [A-Z][a-z]+)'),
+    # First Last with possible titles
+    re.compile(r'^(?:Mr|Mrs|Ms|Dr|Prof)\.?\s*([A-Z][a-z]+ [A-Z][a-z]+(?:-[A-Z][a-z]+)?)'),
+    # Email pattern to extract name before @
+    _EMAIL_RE,
+]
+
+# All name patterns as one alternation. Each pattern has a single capturing
+# group, so the number of the group that matched identifies the pattern, and
+# alternatives are tried in list order, so the first match is the one the
+# highest-priority pattern finds.
+_NAME_UNION_RE = re.compile('|'.join(f'(?:{pattern.pattern})' for pattern in _NAME_PATTERNS))
+
+# Lines that are likely not names, as one alternation so each line is checked
+# with a single match call
+_SKIP_RE = re.compile(
+    r'^(?:'
+    r'\d{4}'  # Years
+    r'|[A-Z]{2,}$'  # Acronyms
+    r'|[A-Z][a-z]+ \d{4}'  # Month Year
+    r'|[A-Z][a-z]+, [A-Z]{2}'  # City, State
+    r'|(?:Phone|Email|Address|LinkedIn|GitHub)'  # Contact headers
+    r'|http'  # URLs
+    r'|\+\d'  # Phone numbers
+    r'|[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'  # Full email
+    r')',
+    re.IGNORECASE,
+)
+
+# Keywords that start a resume section, in priority order for lines that
+# mention more than one section
+_SECTION_KEYWORDS = [
+    ("experience", re.compile(r'experience|work history|employment')),
+    ("education", re.compile(r'education|academic')),
+    ("skills", re.compile(r'skills|competencies')),  # also covers "technical skills"
+    ("contact_info", re.compile(r'contact|phone|email|address')),
+]
+_ANY_SECTION_KEYWORD_RE = re.compile('|'.join(pattern.pattern for _, pattern in _SECTION_KEYWORDS))
+
+_NON_NAME_CHARS_RE = re.compile(r'[^a-zA-Z\s\.-]')
+
+
+# Deletes every ASCII character that isn't a letter, space, period or hyphen
+_ASCII_NON_NAME_CHARS = str.maketrans(
+    "", "", "".join(c for c in map(chr, range(128)) if not (c.isalpha() or c in " .-"))
+)
+
+# Words that show a "name" is really a resume heading
+_NON_NAME_WORDS = frozenset(
+    ("resume", "curriculum", "vitae", "cv", "profile", "contact", "information")
+)
+
+
+def validate_and_clean_name(name: str) -> str:
+    """
+    Validate and clean a candidate name extracted from resume.
+    """
+    if not name:
+        return ""
+
+    # Dropping characters never adds words, so anything under two words can be
+    # rejected before the character filter runs
+    words = name.split()
+    if len(words) < 2:
+        return ""
+
+    # Remove extra whitespace and non-alphabetic characters except spaces, periods, hyphens
+    cleaned = " ".join(words)
+    if cleaned.isascii():
+        cleaned = cleaned.translate(_ASCII_NON_NAME_CHARS)
+    else:
+        cleaned = "".join(c for c in cleaned if c.isalpha() or c in " .-")
+
+    # Check if it looks like a real name (at least 2 words, proper length)
+    if len(cleaned) > 50 or len(cleaned.split()) < 2:
+        return ""
+
+    # Check for common non-name words
+    if not _NON_NAME_WORDS.isdisjoint(cleaned.lower().split()):
+        return ""
+
+    return cleaned
+
+
+# Parsed resumes by content digest, so the same PDF uploaded to several
+# endpoints (or retried) is only parsed once
+_parsed_resumes: LRUCache = LRUCache(maxsize=512)
+_parsed_resumes_lock = threading.Lock()
+
+
+def _content_digest(pdf_file) -> bytes:
+    """
+    BLAKE2b digest of a PDF given as bytes or a file object (read in chunks and
+    rewound, so the file can still be parsed afterwards).
+    """
+    if not hasattr(pdf_file, 'read'):
+        return hashlib.blake2b(pdf_file, digest_size=16).digest()
+    digest = hashlib.blake2b(digest_size=16)
+    while chunk := pdf_file.read(65536):
+        digest.update(chunk)
+    pdf_file.seek(0)
+    return digest.digest()
+
+
+def _name_candidates(line: str) -> Iterator[str]:
+    """
+    Yield the names the patterns find in a line, in pattern priority order. One
+    search over the union finds the first; the remaining patterns are only run
+    if the caller asks for more.
+    """
+    match = _NAME_UNION_RE.search(line)
+    if match is None:
+        return
+    yield match[match.lastindex]
+    for pattern in _NAME_PATTERNS[match.lastindex:]:
+        match = pattern.search(line)
+        if match:
+            yield match[1]
+
 
 class PDFParser:
     @staticmethod
@@ -15,6 +153,14 @@ class PDFParser:
         Returns:
             str: Extracted text content or None if extraction fails
         """
+        # PyMuPDF is several times faster than PyPDF2; PyPDF2 remains as a
+        # fallback for files PyMuPDF can't decode
+        text = PDFParser._extract_text_with_pymupdf(pdf_file)
+        if text:
+            return text
+        if hasattr(pdf_file, 'seek'):
+            pdf_file.seek(0)
+
         try:
             # Handle both file objects and bytes
             if hasattr(pdf_file, 'read'):
@@ -22,48 +168,37 @@ class PDFParser:
             else:
                 pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_file))
             
-            text_content = ""
-            for page_num in range(len(pdf_reader.pages)):
-                page = pdf_reader.pages[page_num]
-                text_content += page.extract_text() + "\n"
-            
-            return text_content.strip()
+            return "\n".join(page.extract_text() or "" for page in pdf_reader.pages).strip()
             
         except Exception as e:
             print(f"Error extracting text from PDF: {str(e)}")
             return None
 
     @staticmethod
-    def extract_name_from_resume(text: str) -> Optional[str]:
+    def _extract_text_with_pymupdf(pdf_file) -> Optional[str]:
+        """
+        Extract plain text with PyMuPDF. Returns None if the PDF can't be decoded.
+        """
+        try:
+            data = pdf_file.read() if hasattr(pdf_file, 'read') else pdf_file
+            # "text" mode skips the layout analysis the name/section matching doesn't need
+            with pymupdf.open(stream=data, filetype="pdf") as doc:
+                return "\n".join(page.get_text("text") for page in doc).strip()
+        except Exception as e:
+            print(f"PyMuPDF could not extract text, falling back to PyPDF2: {str(e)}")
+            return None
+
+    @staticmethod
+    def extract_name_from_resume(lines: List[str]) -> Optional[str]:
         """
         Extract candidate name from resume text using various patterns.
         
         Args:
-            text: Extracted text from resume
+            lines: Extracted text from resume, split into lines
             
         Returns:
             str: Extracted name or None if not found
         """
-        lines = text.split('\n')
-        
-        # Common name patterns - look at the first few lines where names typically appear
-        name_patterns = [
-            # First Middle Last (3+ words)
-            r'^([A-Z][a-z]+ [A-Z][a-z]+ [A-Z][a-z]+(?: [A-Z][a-z]+)?)',
-            # First Last (capitalized words)
-            r'^([A-Z][a-z]+ [A-Z][a-z]+(?:-[A-Z][a-z]+)?)',
-            # First Middle Last
-            r'^([A-Z][a-z]+ [A-Z]\.?[A-Z]? [A-Z][a-z]+)',
-            # First M. Last
-            r'^([A-Z][a-z]+ [A-Z]\. [A-Z][a-z]+)',
-            # Last, First
-            r'^([A-Z][a-z]+, [A-Z][a-z]+)',
-            # First Last with possible titles
-            r'^(?:Mr|Mrs|Ms|Dr|Prof)\.?\s*([A-Z][a-z]+ [A-Z][a-z]+(?:-[A-Z][a-z]+)?)',
-            # Email pattern to extract name before @
-            r'([a-zA-Z]+(?:\.[a-zA-Z]+)?)@[a-zA-Z]+\.[a-zA-Z]{2,}'
-        ]
-        
         # Check first 10 lines for name patterns
         for i, line in enumerate(lines[:10]):
             line = line.strip()
@@ -71,42 +206,22 @@ class PDFParser:
                 continue
                 
             # Skip lines that are likely not names
-            skip_patterns = [
-                r'^\d{4}',  # Years
-                r'^[A-Z]{2,}$',  # Acronyms
-                r'^[A-Z][a-z]+ \d{4}',  # Month Year
-                r'^[A-Z][a-z]+, [A-Z]{2}',  # City, State
-                r'^(?:Phone|Email|Address|LinkedIn|GitHub)',  # Contact headers
-                r'^http',  # URLs
-                r'^\+\d',  # Phone numbers
-                r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'  # Full email
-            ]
-            
-            if any(re.match(pattern, line, re.IGNORECASE) for pattern in skip_patterns):
+            if _SKIP_RE.match(line):
                 continue
                 
             # Try to extract name using patterns
-            for pattern in name_patterns:
-                match = re.search(pattern, line)
-                if match:
-                    potential_name = match.group(1)
-                    # Clean up the name
-                    potential_name = re.sub(r'[^a-zA-Z\s\.-]', '', potential_name).strip()
-                    
-                    # Import the validation function from main
-                    import sys
-                    import os
-                    sys.path.append(os.path.dirname(__file__))
-                    from main import validate_and_clean_name
-                    
-                    # Use the comprehensive validation function
-                    validated_name = validate_and_clean_name(potential_name)
-                    if validated_name:
-                        return validated_name
+            for potential_name in _name_candidates(line):
+                # Clean up the name
+                potential_name = _NON_NAME_CHARS_RE.sub('', potential_name).strip()
+                
+                # Use the comprehensive validation function
+                validated_name = validate_and_clean_name(potential_name)
+                if validated_name:
+                    return validated_name
         
         # If no name found in first lines, try to extract from email
         for line in lines:
-            email_match = re.search(r'([a-zA-Z]+(?:\.[a-zA-Z]+)?)@[a-zA-Z]+\.[a-zA-Z]{2,}', line)
+            email_match = _EMAIL_RE.search(line)
             if email_match:
                 email_name = email_match.group(1)
                 # Convert email name to proper case
@@ -123,18 +238,41 @@ class PDFParser:
         Parse resume PDF and return structured data.
         This is a basic implementation - can be enhanced with NLP for better parsing.
         
+        Results are cached by file content, so re-uploads of the same PDF skip
+        extraction and parsing; the returned dict is shared and must not be modified.
+        
         Args:
             pdf_file: File object or bytes containing PDF data
             
         Returns:
             dict: Structured resume data
         """
-        text = PDFParser.extract_text_from_pdf(pdf_file)
+        key = _content_digest(pdf_file)
+        with _parsed_resumes_lock:
+            cached = _parsed_resumes.get(key)
+        if cached is not None:
+            return cached
+
+        resume_data = PDFParser._parse_resume_text(PDFParser.extract_text_from_pdf(pdf_file))
+        # Failed parses aren't cached, so a transient failure can be retried
+        if "error" not in resume_data:
+            with _parsed_resumes_lock:
+                _parsed_resumes[key] = resume_data
+        return resume_data
+
+    @staticmethod
+    def _parse_resume_text(text: Optional[str]) -> dict:
+        """
+        Build the structured resume data from extracted text.
+        """
         if not text:
             return {"error": "Failed to extract text from PDF"}
         
+        # Split once; name extraction and section parsing share the lines
+        lines = text.split('\n')
+
         # Extract name from resume
-        candidate_name = PDFParser.extract_name_from_resume(text)
+        candidate_name = PDFParser.extract_name_from_resume(lines)
         
         # Basic parsing - can be enhanced based on resume format
         resume_data = {
@@ -148,19 +286,18 @@ class PDFParser:
         }
         
         # Simple section extraction (can be improved)
-        lines = text.split('\n')
         current_section = "general"
         
         for line in lines:
-            line_lower = line.lower().strip()
-            if any(keyword in line_lower for keyword in ["experience", "work history", "employment"]):
-                current_section = "experience"
-            elif any(keyword in line_lower for keyword in ["education", "academic"]):
-                current_section = "education"
-            elif any(keyword in line_lower for keyword in ["skills", "technical skills", "competencies"]):
-                current_section = "skills"
-            elif any(keyword in line_lower for keyword in ["contact", "phone", "email", "address"]):
-                current_section = "contact_info"
+            # Keywords are matched anywhere in the line, so surrounding whitespace
+            # doesn't matter and the line is only lowercased, not stripped
+            line_lower = line.lower()
+            # Most lines mention no keyword at all and are ruled out by one search
+            if _ANY_SECTION_KEYWORD_RE.search(line_lower):
+                for section, pattern in _SECTION_KEYWORDS:
+                    if pattern.search(line_lower):
+                        current_section = section
+                        break
             
             if current_section not in resume_data["sections"]:
                 resume_data["sections"][current_section] = []
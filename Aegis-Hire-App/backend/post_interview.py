@@ -1,18 +1,135 @@
 from pydantic import BaseModel
-from typing import List, Dict, Optional
+from typing import Any, AsyncIterator, List, Dict, Optional, Tuple
 import uuid
-from datetime import datetime
-import google.generativeai as genai
-import os
+from datetime import datetime, timezone
+import re
+from collections import defaultdict
+from functools import lru_cache
+from cachetools import LRUCache
 from dotenv import load_dotenv
+from context_cache import CachedPromptModel
+from genai_client import GEMINI_API_KEY, get_genai
+from response_cache import ExactLLMCache
 
 # Load environment variables
 load_dotenv()
 
-# Configure the Gemini API key
-api_key = os.getenv("GEMINI_API_KEY")
-if api_key:
-    genai.configure(api_key=api_key)
+# The Gemini SDK itself is imported and configured lazily by genai_client, which
+# also reads the key (GEMINI_API_KEY, or GOOGLE_API_KEY as a fallback)
+api_key = GEMINI_API_KEY
+
+# Most recently generated analyses kept in memory
+MAX_STORED_ANALYSES = 10_000
+
+# Fixed instructions and output format for every analysis request. Stored once as
+# Gemini cached content so only the interview itself is sent per request.
+ANALYSIS_SYSTEM_PROMPT = """
+You are an experienced hiring panel lead. Conduct a comprehensive, evidence-based
+post-interview analysis for the position you are given. Base the analysis on the
+provided job description, interview transcript, and interviewer notes.
+
+Generate the analysis using the exact following format. Do not add any extra text before or after these sections.
+
+### OVERALL RATING ###
+[A single integer from 1 to 5]
+
+### COMPETENCIES ASSESSED ###
+- Competency: [Competency Name 1] | Rating: [1-5] | Evidence: [Quote or summary from transcript] | Recommendation: [Brief recommendation]
+- Competency: [Competency Name 2] | Rating: [1-5] | Evidence: [Quote or summary from transcript] | Recommendation: [Brief recommendation]
+- Competency: [Competency Name 3] | Rating: [1-5] | Evidence: [Quote or summary from transcript] | Recommendation: [Brief recommendation]
+
+### STRENGTHS ###
+- [Strength 1]
+- [Strength 2]
+- [Strength 3]
+
+### AREAS FOR DEVELOPMENT ###
+- [Area 1]
+- [Area 2]
+- [Area 3]
+
+### HIRING RECOMMENDATION ###
+[A single phrase: Strong Hire, Consider, or Reject]
+
+### DIVERSITY INSIGHTS ###
+[A brief, objective comment on the candidate's potential contribution to a diverse and inclusive workplace]
+"""
+
+
+# One "### HEADER ###" section; the body runs up to the next "###" or the end of the
+# response. Matched inside a lookahead so a header's closing "###" can also open the
+# next header, as it could with str.split.
+_SECTION_RE = re.compile(r"(?=### (?P<header>[^#\n]+?) ###(?P<body>.*?)(?:###|\Z))", re.DOTALL)
+
+
+def _parse_sections(text: str) -> Dict[str, str]:
+    """
+    Split an analysis response into {header: body} in a single pass. If a header
+    repeats, its first occurrence wins.
+    """
+    sections: Dict[str, str] = {}
+    for match in _SECTION_RE.finditer(text):
+        sections.setdefault(match["header"], match["body"].strip())
+    return sections
+
+
+# Sections whose body is a "- item" bullet list
+_LIST_SECTIONS = ("STRENGTHS", "AREAS FOR DEVELOPMENT")
+
+
+def _parse_competencies(content: str) -> List["CompetencyAssessment"]:
+    """
+    Parse "- Competency: ... | Rating: ... | Evidence: ... | Recommendation: ..."
+    lines. Fields may come in any order and missing ones get defaults; lines with
+    a field lacking ":" or a non-numeric rating are logged and skipped.
+    """
+    competencies_assessed = []
+    for line in content.split("\n"):
+        if not line.strip():
+            continue
+        fields = {}
+        try:
+            for part in line.lstrip("- ").split("|"):
+                key, sep, value = part.partition(":")
+                if not sep:
+                    raise ValueError(f"no ':' in {part.strip()!r}")
+                fields[key.strip()] = value.strip()
+            competencies_assessed.append(
+                CompetencyAssessment(
+                    competency=fields.get("Competency", ""),
+                    rating=int(fields.get("Rating", 0)),
+                    evidence=fields.get("Evidence", ""),
+                    recommendation=fields.get("Recommendation", ""),
+                )
+            )
+        except ValueError as e:
+            print(f"Could not parse competency line: {line}. Error: {e}")
+    return competencies_assessed
+
+
+def _section_value(header: str, content: str) -> Any:
+    """
+    Convert a section body to the type its PostInterviewAnalysis field expects.
+    """
+    if header in _LIST_SECTIONS:
+        return [line.strip().lstrip("- ") for line in content.split("\n") if line.strip()]
+    if header == "COMPETENCIES ASSESSED":
+        return _parse_competencies(content)
+    if header == "OVERALL RATING":
+        return int(content) if content.isdigit() else 0
+    return content
+
+
+@lru_cache(maxsize=1)
+def _get_analysis_model() -> Optional[CachedPromptModel]:
+    """
+    Build the shared model on first use; None when no API key is configured.
+    """
+    if not api_key:
+        return None
+    return CachedPromptModel(
+        "gemini-2.5-flash", ANALYSIS_SYSTEM_PROMPT, display_name="post-interview-system"
+    )
 
 
 class PostInterviewAnalysisRequest(BaseModel):
@@ -50,138 +167,172 @@ class PostInterviewAnalysisService:
     """
 
     def __init__(self):
-        self.analyses: Dict[str, PostInterviewAnalysis] = {}
+        # Bounded so a long-running server doesn't keep every analysis forever
+        self.analyses: LRUCache = LRUCache(maxsize=MAX_STORED_ANALYSES)
+        # candidate_name -> ids of their stored analyses, oldest first
+        self._by_candidate: Dict[str, List[str]] = defaultdict(list)
+        self.response_cache = ExactLLMCache()
+
+    @staticmethod
+    def _analysis_prompt(analysis_request: PostInterviewAnalysisRequest) -> str:
+        # Only the interview itself; the analysis format comes from the cached system prompt
+        return f"""
+            - **Position:** {analysis_request.job_title}
+            - **Candidate Name:** {analysis_request.candidate_name}
+            - **Job Description:** {analysis_request.job_description}
+            - **Interview Transcript:** {analysis_request.interview_transcript}
+            - **Interviewer Notes:** {analysis_request.interviewer_notes}
+            """
 
-    def generate_analysis(
+    def _build_analysis(
+        self, analysis_request: PostInterviewAnalysisRequest, analysis_text: str
+    ) -> PostInterviewAnalysis:
+        """
+        Parse a complete response into an analysis and store it.
+        """
+        sections = _parse_sections(analysis_text)
+
+        def parse_section(header):
+            return _section_value(header, sections.get(header, ""))
+
+        analysis = PostInterviewAnalysis(
+            id=uuid.uuid4().hex,
+            interview_session_id=analysis_request.interview_session_id,
+            candidate_name=analysis_request.candidate_name,
+            overall_rating=parse_section("OVERALL RATING"),
+            competencies_assessed=parse_section("COMPETENCIES ASSESSED"),
+            strengths=parse_section("STRENGTHS"),
+            areas_for_development=parse_section("AREAS FOR DEVELOPMENT"),
+            hiring_recommendation=parse_section("HIRING RECOMMENDATION"),
+            diversity_insights=parse_section("DIVERSITY INSIGHTS"),
+            created_at=datetime.now(timezone.utc),
+        )
+
+        self._store(analysis)
+        return analysis
+
+    async def generate_analysis(
         self, analysis_request: PostInterviewAnalysisRequest
     ) -> Optional[PostInterviewAnalysis]:
         """
         Generate a post-interview analysis based on the interview transcript and job description.
         """
-        if not api_key:
+        model = _get_analysis_model()
+        if model is None:
             return None
 
         try:
-            model = genai.GenerativeModel("gemini-2.5-flash")
+            analysis_prompt = self._analysis_prompt(analysis_request)
 
-            # Create a prompt to generate the post-interview analysis
-            analysis_prompt = f"""
-            Conduct a comprehensive, evidence-based post-interview analysis for the position of {analysis_request.job_title}.
-            Base the analysis on the provided job description, interview transcript, and interviewer notes.
+            # Exact matches only, scoped per interview: an edited transcript or set of
+            # notes is still near-identical to the original and must be re-analysed
+            analysis_text = self.response_cache.lookup(
+                analysis_prompt, analysis_request.interview_session_id
+            )
+            if analysis_text is None:
+                response = await model.generate_content_async(
+                    analysis_prompt,
+                    generation_config=get_genai().GenerationConfig(
+                        temperature=0.4,  # Moderate temperature for balanced analysis
+                    ),
+                )
 
-            - **Candidate Name:** {analysis_request.candidate_name}
-            - **Job Description:** {analysis_request.job_description}
-            - **Interview Transcript:** {analysis_request.interview_transcript}
-            - **Interviewer Notes:** {analysis_request.interviewer_notes}
+                if not response or not hasattr(response, "text") or not response.text:
+                    return None
 
-            Please generate the analysis using the exact following format. Do not add any extra text before or after these sections.
+                analysis_text = response.text
+                self.response_cache.put(
+                    analysis_prompt, analysis_text, analysis_request.interview_session_id
+                )
 
-            ### OVERALL RATING ###
-            [A single integer from 1 to 5]
+            return self._build_analysis(analysis_request, analysis_text)
 
-            ### COMPETENCIES ASSESSED ###
-            - Competency: [Competency Name 1] | Rating: [1-5] | Evidence: [Quote or summary from transcript] | Recommendation: [Brief recommendation]
-            - Competency: [Competency Name 2] | Rating: [1-5] | Evidence: [Quote or summary from transcript] | Recommendation: [Brief recommendation]
-            - Competency: [Competency Name 3] | Rating: [1-5] | Evidence: [Quote or summary from transcript] | Recommendation: [Brief recommendation]
+        except Exception as e:
+            print(f"Error generating post-interview analysis: {e}")
+            return None
 
-            ### STRENGTHS ###
-            - [Strength 1]
-            - [Strength 2]
-            - [Strength 3]
+    async def stream_analysis(
+        self, analysis_request: PostInterviewAnalysisRequest
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Stream a post-interview analysis as ("section", {"header", "content"})
+        events, each sent as soon as the next "###" header shows the section is
+        complete, followed by one ("analysis", ...) event with the stored analysis.
+        """
+        model = _get_analysis_model()
+        if model is None:
+            print("DEBUG: No GEMINI_API_KEY found - cannot generate interview analysis")
+            return
 
-            ### AREAS FOR DEVELOPMENT ###
-            - [Area 1]
-            - [Area 2]
-            - [Area 3]
+        analysis_prompt = self._analysis_prompt(analysis_request)
+        analysis_text = self.response_cache.lookup(
+            analysis_prompt, analysis_request.interview_session_id
+        )
 
-            ### HIRING RECOMMENDATION ###
-            [A single phrase: Strong Hire, Consider, or Reject]
+        emitted = set()
 
-            ### DIVERSITY INSIGHTS ###
-            [A brief, objective comment on the candidate's potential contribution to a diverse and inclusive workplace]
+        def completed_sections(text: str, pos: int, final: bool):
             """
-
-            response = model.generate_content(
+            Events for the sections of text after pos that are complete (every
+            remaining section when final), and the position to resume from.
+            """
+            events = []
+            for match in _SECTION_RE.finditer(text, pos):
+                if not final and match.end("body") == len(text):
+                    break
+                pos = match.end("body")
+                header = match["header"]
+                if header in emitted:
+                    continue
+                emitted.add(header)
+                content = _section_value(header, match["body"].strip())
+                if header == "COMPETENCIES ASSESSED":
+                    content = [competency.model_dump() for competency in content]
+                events.append(("section", {"header": header, "content": content}))
+            return events, pos
+
+        pos = 0
+        if analysis_text is None:
+            analysis_text = ""
+            response = await model.generate_content_async(
                 analysis_prompt,
-                generation_config=genai.GenerationConfig(
-                    temperature=0.4,  # Moderate temperature for balanced analysis
-                ),
+                stream=True,
+                generation_config=get_genai().GenerationConfig(temperature=0.4),
             )
-
-            if not response or not hasattr(response, "text") or not response.text:
-                return None
-
-            analysis_text = response.text
-
-            # Helper function for parsing sections
-            def parse_section(text, header):
-                try:
-                    content = text.split(f"### {header} ###")[1].split("###")[0].strip()
-                    if header in ["STRENGTHS", "AREAS FOR DEVELOPMENT"]:
-                        return [
-                            line.strip().lstrip("- ")
-                            for line in content.split("\n")
-                            if line.strip()
-                        ]
-                    return content
-                except IndexError:
-                    return (
-                        ""
-                        if header not in ["STRENGTHS", "AREAS FOR DEVELOPMENT"]
-                        else []
-                    )
-
-            # Parse competencies
-            competencies_assessed = []
-            competencies_text = parse_section(analysis_text, "COMPETENCIES ASSESSED")
-            for line in competencies_text.split("\n"):
-                if not line.strip():
+            async for chunk in response:
+                # The final chunk may carry only the finish reason and no text
+                if not chunk.parts:
                     continue
-                parts = [p.strip() for p in line.lstrip("- ").split("|")]
-                try:
-                    competency_data = {
-                        item.split(":")[0].strip(): item.split(":", 1)[1].strip()
-                        for item in parts
-                    }
-                    competencies_assessed.append(
-                        CompetencyAssessment(
-                            competency=competency_data.get("Competency", ""),
-                            rating=int(competency_data.get("Rating", 0)),
-                            evidence=competency_data.get("Evidence", ""),
-                            recommendation=competency_data.get("Recommendation", ""),
-                        )
-                    )
-                except (IndexError, ValueError) as e:
-                    print(f"Could not parse competency line: {line}. Error: {e}")
-
-            overall_rating_str = parse_section(analysis_text, "OVERALL RATING")
-
-            analysis = PostInterviewAnalysis(
-                id=str(uuid.uuid4()),
-                interview_session_id=analysis_request.interview_session_id,
-                candidate_name=analysis_request.candidate_name,
-                overall_rating=(
-                    int(overall_rating_str) if overall_rating_str.isdigit() else 0
-                ),
-                competencies_assessed=competencies_assessed,
-                strengths=parse_section(analysis_text, "STRENGTHS"),
-                areas_for_development=parse_section(
-                    analysis_text, "AREAS FOR DEVELOPMENT"
-                ),
-                hiring_recommendation=parse_section(
-                    analysis_text, "HIRING RECOMMENDATION"
-                ),
-                diversity_insights=parse_section(analysis_text, "DIVERSITY INSIGHTS"),
-                created_at=datetime.now(),
+                analysis_text += chunk.text
+                events, pos = completed_sections(analysis_text, pos, final=False)
+                for event in events:
+                    yield event
+            if not analysis_text:
+                return
+            self.response_cache.put(
+                analysis_prompt, analysis_text, analysis_request.interview_session_id
             )
 
-            # Store the analysis
-            self.analyses[analysis.id] = analysis
-            return analysis
+        events, _ = completed_sections(analysis_text, pos, final=True)
+        for event in events:
+            yield event
 
-        except Exception as e:
-            print(f"Error generating post-interview analysis: {e}")
-            return None
+        analysis = self._build_analysis(analysis_request, analysis_text)
+        yield ("analysis", analysis.model_dump(mode="json"))
+
+    def _store(self, analysis: PostInterviewAnalysis):
+        """
+        Store an analysis and index it by candidate, evicting the least recently
+        used analysis (and its index entry) when the store is full.
+        """
+        if len(self.analyses) >= self.analyses.maxsize:
+            _, evicted = self.analyses.popitem()
+            analysis_ids = self._by_candidate[evicted.candidate_name]
+            analysis_ids.remove(evicted.id)
+            if not analysis_ids:
+                del self._by_candidate[evicted.candidate_name]
+        self.analyses[analysis.id] = analysis
+        self._by_candidate[analysis.candidate_name].append(analysis.id)
 
     def get_analysis(self, analysis_id: str) -> Optional[PostInterviewAnalysis]:
         """
@@ -196,9 +347,8 @@ class PostInterviewAnalysisService:
         Retrieve all analyses for a specific candidate.
         """
         return [
-            analysis
-            for analysis in self.analyses.values()
-            if analysis.candidate_name == candidate_name
+            self.analyses[analysis_id]
+            for analysis_id in self._by_candidate.get(candidate_name, ())
         ]
 
 
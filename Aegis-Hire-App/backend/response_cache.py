@@ -0,0 +1,53 @@
+from collections import OrderedDict
+from typing import Any, Optional
+import hashlib
+import threading
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize user input so trivially different prompts share a cache key.
+    """
+    return " ".join(text.lower().split())
+
+
+class ExactLLMCache:
+    """
+    LRU cache for LLM responses, keyed on the SHA-256 of the normalized input.
+
+    Entries are scoped (e.g. to a candidate or interview), so the same input under
+    a different scope is a separate entry. Only exact matches are returned: the
+    inputs cached here are generated artifacts and growing or editable texts,
+    where a near-duplicate input must not get the stored response.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+
+    @staticmethod
+    def _key(scope: str, text: str) -> str:
+        return hashlib.sha256(f"{scope}\x00{normalize_text(text)}".encode()).hexdigest()
+
+    def lookup(self, text: str, scope: str = "") -> Optional[Any]:
+        """
+        Return the cached response for the given input, or None.
+        """
+        key = self._key(scope, text)
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, text: str, value: Any, scope: str = ""):
+        """
+        Store a response for the given input.
+        """
+        key = self._key(scope, text)
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
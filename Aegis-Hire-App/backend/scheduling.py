@@ -1,16 +1,188 @@
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Set
+from typing import List, Dict, Optional, Set, Tuple
+from bisect import bisect_left, bisect_right
+from typing_extensions import TypedDict
+import re
+import logging
+import asyncio
 import uuid
+import random
 from pydantic import BaseModel
-import google.generativeai as genai
+from dataclasses import dataclass, field
 import os
+from functools import lru_cache
+import orjson
+import hashlib
+from cachetools import TTLCache
 from dotenv import load_dotenv
+from genai_client import GEMINI_API_KEY, call_gemini, get_genai
 
 # Load environment variables
 load_dotenv(os.path.join(os.path.dirname(__file__), ".env"))
 
+logger = logging.getLogger(__name__)
 
-class Participant(BaseModel):
+# "first.last" or "first_last" usernames: exactly one dot, or failing that exactly
+# one underscore
+_TWO_PART_USERNAME_RE = re.compile(r"([^.]*)\.([^.]*)|([^_]*)_([^_]*)")
+
+# Slot indices in the model's ranking reply, e.g. "2,0,4,1,3"
+_INDEX_RE = re.compile(r"\d+")
+
+# Stands in for the meeting link in drafted emails; the link only exists once
+# the slot is booked
+MEETING_LINK_PLACEHOLDER = "[MEETING LINK]"
+
+
+def _slots_block(slots, time_format: str) -> str:
+    """
+    One compact "index: time (N participants)" line per slot for the ranking prompts,
+    limited to the first 10 slots.
+    """
+    return "\n".join(
+        f"{i}: {slot.start_time.strftime(time_format)} ({len(slot.participants)} participants)"
+        for i, slot in enumerate(slots[:10])
+    )
+
+
+def _start_of_day(moment: datetime) -> datetime:
+    return moment.replace(hour=9, minute=0, second=0, microsecond=0)
+
+
+def _next_week(now: datetime) -> datetime:
+    return _start_of_day(now + timedelta(days=7 - now.weekday()))
+
+
+def _tomorrow(now: datetime) -> datetime:
+    return _start_of_day(now + timedelta(days=1))
+
+
+def _this_week(now: datetime) -> datetime:
+    if now.weekday() >= 5:  # If it's weekend, start next week
+        now = now + timedelta(days=7 - now.weekday())
+    return _start_of_day(now)
+
+
+# Phrases recognised in SchedulingRequest.preferred_time_range, checked in order,
+# each mapped to a function giving the first day to schedule from
+TIME_RANGE_HANDLERS = {
+    "next week": _next_week,
+    "tomorrow": _tomorrow,
+    "this week": _this_week,
+}
+
+
+@lru_cache(maxsize=1)
+def _get_scheduling_model():
+    """
+    Gemini model shared by the ranking and email calls, built on first use.
+    """
+    return get_genai().GenerativeModel('gemini-2.5-flash')
+
+
+class RankingWithEmail(TypedDict):
+    """
+    Response schema for ranking slots and drafting the confirmation email for
+    the top-ranked one in a single Gemini call.
+    """
+
+    top_indices: List[int]
+    email_text: str
+
+
+# Prompt templates and generation configs are built once at import rather than
+# on every call; the templates are filled in with str.format
+RANKING_CRITERIA = """
+Consider these factors for ranking:
+1. Time of day (late morning/early afternoon is usually best)
+2. Day of week (mid-week is often preferred)
+3. Participant availability
+4. General interview best practices
+"""
+
+RANKING_PROMPT = """
+You are an AI scheduling assistant. Rank these interview slots from best to worst for a {duration_minutes}-minute interview.
+
+Candidate: {candidate_name}
+Participants: {participants}
+Requirements: {requirements}
+
+Available Slots (index: time):
+{slots_info}
+""" + RANKING_CRITERIA + """
+Return only the indices of the top 5 slots in order of preference, as a comma-separated list.
+For example: "2,0,4,1,3"
+"""
+
+RANK_AND_EMAIL_PROMPT = """
+You are an AI scheduling assistant for Aegis Hire. Rank these interview slots from best to worst
+for a {duration_minutes}-minute interview, then write the confirmation email for the best one.
+
+Candidate: {candidate_name}
+Participants: {participants}
+Requirements: {requirements}
+
+Available Slots (index: time):
+{slots_info}
+""" + RANKING_CRITERIA + """
+Set top_indices to the indices of the top 5 slots in order of preference.
+
+Set email_text to a professional and friendly confirmation email to the candidate for the
+first slot in top_indices:
+- Interview Team: {interview_team}
+- Duration: {duration_minutes} minutes
+- Meeting Link: write exactly """ + MEETING_LINK_PLACEHOLDER + """
+Start with a warm greeting, confirm the date, time and details clearly, explain how to join
+the virtual meeting, and end with a positive, encouraging closing. The email must be plain
+text only, without any Markdown formatting, ready to send to the candidate.
+"""
+
+CONFIRMATION_EMAIL_PROMPT = """
+You are an AI assistant for Aegis Hire. Write a professional and friendly confirmation email to an interview candidate.
+
+**Interview Details:**
+- **Candidate Name:** {candidate_name}
+- **Date and Time:** {start_time}
+- **Duration:** {duration_minutes} minutes
+- **Interview Team:** {interview_team}
+- **Meeting Link:** {meeting_link}
+
+**Instructions:**
+1.  Start with a warm and professional greeting.
+2.  Confirm the interview details clearly.
+3.  Provide instructions for joining the virtual meeting.
+4.  End with a positive and encouraging closing.
+5.  The email should be ready to be sent directly to the candidate.
+6.  **IMPORTANT**: The output must be plain text only. Do not use any Markdown formatting (like **, *, etc.).
+
+Generate the plain text email content now.
+"""
+
+# Generation configs are built on first use, not at import, so importing this
+# module doesn't load the Gemini SDK; each is then reused
+@lru_cache(maxsize=1)
+def _get_ranking_config():
+    return get_genai().GenerationConfig(temperature=0.3)
+
+
+@lru_cache(maxsize=1)
+def _get_rank_and_email_config():
+    return get_genai().GenerationConfig(
+        temperature=0.3,
+        response_mime_type="application/json",
+        response_schema=RankingWithEmail,
+    )
+
+
+@lru_cache(maxsize=1)
+def _get_email_config():
+    return get_genai().GenerationConfig(temperature=0.5)
+
+
+# Slots are created by the thousand when a week is generated, so participants and
+# slots are plain slotted dataclasses; Pydantic keeps the instances as-is in responses
+@dataclass(slots=True)
+class Participant:
     id: str
     name: str
     email: str
@@ -18,7 +190,8 @@ class Participant(BaseModel):
     calendar_id: Optional[str] = None  # For calendar integration
 
 
-class InterviewSlot(BaseModel):
+@dataclass(slots=True)
+class InterviewSlot:
     id: str
     start_time: datetime
     end_time: datetime
@@ -26,9 +199,9 @@ class InterviewSlot(BaseModel):
     available: bool = True
     booked_by: Optional[str] = None  # User ID of the person who booked
     booked_for: Optional[str] = None  # Candidate name
-    participants: List[Participant] = []
+    participants: List[Participant] = field(default_factory=list)
     meeting_link: Optional[str] = None
-    calendar_event_ids: Dict[str, str] = {}  # participant_id -> calendar_event_id
+    calendar_event_ids: Dict[str, str] = field(default_factory=dict)  # participant_id -> calendar_event_id
 
 
 class SchedulingRequest(BaseModel):
@@ -48,6 +221,64 @@ class SchedulingResponse(BaseModel):
     email_content: Optional[str] = None
 
 
+class FreeBusyProvider:
+    """
+    Source of participants' busy times, queried once per scheduling request for
+    all participants (like a calendar FreeBusy query). This default reports
+    everyone as free; a calendar-backed provider can be assigned to
+    InterviewScheduler.freebusy_provider.
+
+    Providers with a batched endpoint override query; providers that can only
+    read one calendar at a time override freebusy, and query runs those
+    lookups concurrently.
+    """
+
+    async def freebusy(self, email: str, start: datetime, end: datetime) -> List[Tuple[datetime, datetime]]:
+        """Return one participant's (busy_start, busy_end) intervals between start and end."""
+        return []
+
+    async def query(self, emails: List[str], start: datetime, end: datetime) -> Dict[str, List[Tuple[datetime, datetime]]]:
+        """
+        Return (busy_start, busy_end) intervals between start and end, keyed by
+        email. Participants missing from the result are treated as free.
+        """
+        results = await asyncio.gather(
+            *(self.freebusy(email, start, end) for email in emails), return_exceptions=True
+        )
+        busy_by_email = {}
+        for email, busy in zip(emails, results):
+            if isinstance(busy, Exception):
+                # A calendar that can't be read shouldn't fail the whole request
+                logger.warning("Free/busy lookup failed for %s: %s", email, busy)
+            elif busy:
+                busy_by_email[email] = busy
+        return busy_by_email
+
+
+def _merge_busy(intervals: List[Tuple[datetime, datetime]]) -> Tuple[List[datetime], List[datetime]]:
+    """
+    Sort and merge busy intervals into parallel start/end lists, so overlap
+    with a slot can be checked with a single bisect.
+    """
+    starts: List[datetime] = []
+    ends: List[datetime] = []
+    for busy_start, busy_end in sorted(intervals):
+        if ends and busy_start <= ends[-1]:
+            ends[-1] = max(ends[-1], busy_end)
+        else:
+            starts.append(busy_start)
+            ends.append(busy_end)
+    return starts, ends
+
+
+def _is_busy(busy: Tuple[List[datetime], List[datetime]], slot_start: datetime, slot_end: datetime) -> bool:
+    """Whether any merged busy interval overlaps [slot_start, slot_end)."""
+    starts, ends = busy
+    # The last busy interval starting before the slot ends is the only candidate
+    i = bisect_left(starts, slot_end)
+    return i > 0 and ends[i - 1] > slot_start
+
+
 class InterviewScheduler:
     """
     Enhanced interview scheduler that handles multiple participants and calendar integration.
@@ -56,10 +287,22 @@ class InterviewScheduler:
     
     def __init__(self):
         self.slots: Dict[str, InterviewSlot] = {}
+        # IDs of the slots that are still open for booking
+        self._available_ids: Set[str] = set()
+        # The same slots ordered by start time, with their start times alongside
+        # for bisecting date ranges
+        self._slots_by_start: List[InterviewSlot] = []
+        self._slot_starts: List[datetime] = []
         self.participants: Dict[str, Participant] = {}
-        self.api_key = os.getenv("GEMINI_API_KEY")
-        if self.api_key:
-            genai.configure(api_key=self.api_key)
+        # Lowercased email -> participant, for O(1) lookups by email
+        self._email_index: Dict[str, Participant] = {}
+        self.api_key = GEMINI_API_KEY
+        # slot_id -> confirmation email drafted alongside the ranking
+        self._email_drafts: Dict[str, str] = {}
+        # Ranking request key -> start times of the ranked slots, so repeated
+        # requests (e.g. a UI refresh) skip the Gemini call for a few minutes
+        self._ranking_cache: TTLCache = TTLCache(maxsize=512, ttl=300)
+        self.freebusy_provider = FreeBusyProvider()
 
         # Initialize with default HR employees
         self._initialize_default_participants()
@@ -82,22 +325,17 @@ class InterviewScheduler:
         ]
 
         for participant in default_participants:
-            self.participants[participant.id] = participant
+            self._store_participant(participant)
 
     def _generate_name_from_email(self, email: str) -> str:
         """Generate a proper name from an email address."""
-        username = email.split('@')[0]
+        username = email.partition('@')[0]
 
         # Handle common email formats
-        if '.' in username:
-            parts = username.split('.')
-            if len(parts) == 2:
-                return f"{parts[0].title()} {parts[1].title()}"
-
-        if '_' in username:
-            parts = username.split('_')
-            if len(parts) == 2:
-                return f"{parts[0].title()} {parts[1].title()}"
+        match = _TWO_PART_USERNAME_RE.fullmatch(username)
+        if match:
+            first, last = match.group(1, 2) if match.group(1) is not None else match.group(3, 4)
+            return f"{first.title()} {last.title()}"
 
         # Handle first initial + last name format (e.g., "jsmith")
         if len(username) >= 2 and username[1:] and username[0].isalpha():
@@ -106,20 +344,26 @@ class InterviewScheduler:
         # Default case - just title case the username
         return username.title()
     
+    def _store_participant(self, participant: Participant):
+        """Store a participant and index it by email, replacing any with the same ID."""
+        previous = self.participants.get(participant.id)
+        if previous is not None and self._email_index.get(previous.email.lower()) is previous:
+            del self._email_index[previous.email.lower()]
+        self.participants[participant.id] = participant
+        # The first participant registered with an email keeps it
+        self._email_index.setdefault(participant.email.lower(), participant)
+    
     def add_participant(self, participant: Participant) -> bool:
         """Add a participant to the system."""
         try:
-            self.participants[participant.id] = participant
+            self._store_participant(participant)
             return True
         except Exception:
             return False
     
     def get_participant_by_email(self, email: str) -> Optional[Participant]:
         """Get a participant by their email address."""
-        for participant in self.participants.values():
-            if participant.email.lower() == email.lower():
-                return participant
-        return None
+        return self._email_index.get(email.lower())
     
     def create_available_slots_for_week(self, start_date: datetime, duration_minutes: int = 45) -> List[InterviewSlot]:
         """
@@ -127,39 +371,61 @@ class InterviewScheduler:
         """
         slots = []
         end_date = start_date + timedelta(days=7)
+        step = timedelta(minutes=duration_minutes)
+        # Latest hour a slot can start in and still end by 5pm
+        latest_start_hour = min(17, 17 - duration_minutes // 60)
         current_time = start_date
         
         while current_time < end_date:
+            # Weekends have no business hours, so jump straight to Monday 9am
+            if current_time.weekday() >= 5:
+                current_time = (current_time + timedelta(days=7 - current_time.weekday())).replace(
+                    hour=9, minute=0, second=0, microsecond=0
+                )
+                continue
+            
             # Only create slots during business hours (9am to 5pm, Monday to Friday)
-            if (current_time.weekday() < 5 and  # Monday to Friday
-                9 <= current_time.hour <= 17 and
-                current_time.hour + (duration_minutes // 60) <= 17):  # Ensure slot ends by 5pm
-                
-                slot = InterviewSlot(
-                    id=str(uuid.uuid4()),
+            if 9 <= current_time.hour <= latest_start_hour:
+                slots.append(InterviewSlot(
+                    # Random rather than sequential: a request that reaches another
+                    # worker, or arrives after a restart, must not match another slot
+                    id=uuid.uuid4().hex,
                     start_time=current_time,
-                    end_time=current_time + timedelta(minutes=duration_minutes),
+                    end_time=current_time + step,
                     duration_minutes=duration_minutes,
                     available=True
-                )
-                self.slots[slot.id] = slot
-                slots.append(slot)
+                ))
             
             # Move to the next slot
-            current_time += timedelta(minutes=duration_minutes)
+            current_time += step
             
             # If we go past 5pm, move to the next day at 9am
             if current_time.hour >= 17 or current_time.hour < 9:
                 current_time = current_time.replace(hour=9, minute=0, second=0, microsecond=0) + timedelta(days=1)
         
+        self.slots.update((slot.id, slot) for slot in slots)
+        self._available_ids.update(slot.id for slot in slots)
+        self._index_slots(slots)
         return slots
+
+    def _index_slots(self, slots: List[InterviewSlot]):
+        """Insert chronologically ordered slots into the start-time index."""
+        if not self._slot_starts or slots and self._slot_starts[-1] <= slots[0].start_time:
+            # Common case: the new week starts after every indexed slot
+            self._slots_by_start.extend(slots)
+            self._slot_starts.extend(slot.start_time for slot in slots)
+            return
+        for slot in slots:
+            i = bisect_right(self._slot_starts, slot.start_time)
+            self._slots_by_start.insert(i, slot)
+            self._slot_starts.insert(i, slot.start_time)
     
-    def find_available_slots_for_participants(self, participant_emails: List[str], 
+    async def find_available_slots_for_participants(self, participant_emails: List[str], 
                                            start_date: datetime, end_date: datetime, 
                                            duration_minutes: int = 45) -> List[InterviewSlot]:
         """
         Find available slots that work for all specified participants.
-        In a real implementation, this would check each participant's calendar availability.
+        Busy times for every participant are fetched in one freebusy_provider query.
         """
         # Get participants
         participants = []
@@ -176,18 +442,24 @@ class InterviewScheduler:
         # Get all available slots in the date range
         all_slots = self.get_available_slots(start_date, end_date)
         
-        # In a real implementation, we would check each participant's calendar
-        # For now, we'll simulate this by randomly making different participants available for different slots
-        import random
+        busy_by_email = await self.freebusy_provider.query(
+            [participant.email for participant in participants], start_date, end_date
+        )
+        busy = {
+            email.lower(): _merge_busy(intervals)
+            for email, intervals in busy_by_email.items()
+            if intervals
+        }
         available_slots = []
 
         for slot in all_slots:
-            # Randomly determine which participants are available for this slot
-            available_participants = []
-            for participant in participants:
-                # Each participant has a 70% chance of being available for any given slot
-                if random.random() < 0.7:
-                    available_participants.append(participant)
+            # Participants without busy times are free for every slot
+            available_participants = [
+                participant
+                for participant in participants
+                if participant.email.lower() not in busy
+                or not _is_busy(busy[participant.email.lower()], slot.start_time, slot.end_time)
+            ]
 
             # Always include the slot, even if only 1 participant is available
             # This ensures we always return some suggestions
@@ -210,41 +482,35 @@ class InterviewScheduler:
         """
         Get available interview slots within a date range.
         """
-        available_slots = []
-        for slot in self.slots.values():
-            if (slot.available and 
-                start_date <= slot.start_time <= end_date):
-                available_slots.append(slot)
-        
-        # Sort by start time
-        available_slots.sort(key=lambda x: x.start_time)
-        return available_slots
+        lo = bisect_left(self._slot_starts, start_date)
+        hi = bisect_right(self._slot_starts, end_date)
+        return [slot for slot in self._slots_by_start[lo:hi] if slot.available]
     
-    def generate_scheduling_suggestions(self, request: SchedulingRequest) -> SchedulingResponse:
+    async def generate_scheduling_suggestions(self, request: SchedulingRequest, draft_email: bool = False) -> SchedulingResponse:
         """
         Generate intelligent scheduling suggestions based on the request.
+        With draft_email, the confirmation email for the top slot is drafted in
+        the same Gemini call as the ranking.
         """
         try:
-            print(f"DEBUG: Starting scheduling for {request.candidate_name}")
-            print(f"DEBUG: API key available: {bool(self.api_key)}")
+            logger.debug("Starting scheduling for %s", request.candidate_name)
+            logger.debug("API key available: %s", bool(self.api_key))
 
             # Clear previously generated available slots to avoid duplicates and state pollution
-            available_slot_ids = [slot_id for slot_id, slot in self.slots.items() if slot.available]
-            for slot_id in available_slot_ids:
+            for slot_id in self._available_ids:
                 del self.slots[slot_id]
+            self._available_ids.clear()
+            self._slots_by_start = [slot for slot in self._slots_by_start if not slot.available]
+            self._slot_starts = [slot.start_time for slot in self._slots_by_start]
+            self._email_drafts.clear()
 
             # Parse the time range
             start_date = datetime.now()
-            if "next week" in request.preferred_time_range.lower():
-                start_date = start_date + timedelta(days=7 - start_date.weekday())
-                start_date = start_date.replace(hour=9, minute=0, second=0, microsecond=0)
-            elif "tomorrow" in request.preferred_time_range.lower():
-                start_date = start_date + timedelta(days=1)
-                start_date = start_date.replace(hour=9, minute=0, second=0, microsecond=0)
-            elif "this week" in request.preferred_time_range.lower():
-                if start_date.weekday() >= 5:  # If it's weekend, start next week
-                    start_date = start_date + timedelta(days=7 - start_date.weekday())
-                start_date = start_date.replace(hour=9, minute=0, second=0, microsecond=0)
+            time_range = request.preferred_time_range.lower()
+            for phrase, start_of_range in TIME_RANGE_HANDLERS.items():
+                if phrase in time_range:
+                    start_date = start_of_range(start_date)
+                    break
 
             end_date = start_date + timedelta(days=7)
 
@@ -252,22 +518,25 @@ class InterviewScheduler:
             self.create_available_slots_for_week(start_date, request.duration_minutes)
 
             # Find slots that work for all participants
-            suggested_slots = self.find_available_slots_for_participants(
+            suggested_slots = await self.find_available_slots_for_participants(
                 request.participant_emails,
                 start_date,
                 end_date,
                 request.duration_minutes
             )
 
-            print(f"DEBUG: Found {len(suggested_slots)} suggested slots")
+            logger.debug("Found %d suggested slots", len(suggested_slots))
 
             # Use AI to rank and suggest the best slots
             if self.api_key and suggested_slots:
-                print("DEBUG: Attempting AI ranking")
-                ranked_slots = self._rank_suggestions_with_ai(request, suggested_slots)
-                print("DEBUG: AI ranking completed successfully")
+                logger.debug("Attempting AI ranking")
+                if draft_email:
+                    ranked_slots = await self._rank_and_draft_email(request, suggested_slots)
+                else:
+                    ranked_slots = await self._rank_suggestions_with_ai(request, suggested_slots)
+                logger.debug("AI ranking completed successfully")
             else:
-                print("DEBUG: Using fallback (no AI ranking)")
+                logger.debug("Using fallback (no AI ranking)")
                 ranked_slots = suggested_slots[:5]  # Return top 5 if no AI available
 
             return SchedulingResponse(
@@ -277,153 +546,216 @@ class InterviewScheduler:
             )
 
         except Exception as e:
-            print(f"DEBUG: Exception in generate_scheduling_suggestions: {e}")
-            import traceback
-            print(f"DEBUG: Full traceback: {traceback.format_exc()}")
+            logger.exception("Failed to generate scheduling suggestions")
             return SchedulingResponse(
                 success=False,
                 message=f"Failed to generate scheduling suggestions: {str(e)}"
             )
     
-    def _rank_suggestions_with_ai(self, request: SchedulingRequest, slots: List[InterviewSlot]) -> List[InterviewSlot]:
+    async def _rank_suggestions_with_ai(self, request: SchedulingRequest, slots: List[InterviewSlot]) -> List[InterviewSlot]:
         """
         Use AI to rank and suggest the best interview slots.
         """
         try:
-            print("DEBUG: Initializing Gemini model for ranking")
-            model = genai.GenerativeModel('gemini-2.5-flash')
+            cache_key = self._ranking_cache_key(request, slots)
+            cached_starts = self._ranking_cache.get(cache_key)
+            if cached_starts is not None:
+                # Slots are regenerated on every request, so map the cached start times back to them
+                index_by_start = {slot.start_time: i for i, slot in enumerate(slots)}
+                logger.debug("Using cached AI ranking")
+                return self._apply_ranking(
+                    slots, [index_by_start[start] for start in cached_starts if start in index_by_start]
+                )
+
+            model = _get_scheduling_model()
 
             # Prepare slot information for AI analysis
-            slots_info = []
-            for i, slot in enumerate(slots[:10]):  # Limit to first 10 slots
-                slots_info.append({
-                    "index": i,
-                    "day": slot.start_time.strftime("%A"),
-                    "time": slot.start_time.strftime("%I:%M %p"),
-                    "participants": [p.name for p in slot.participants]
-                })
-
-            print(f"DEBUG: Prepared slots info: {len(slots_info)} slots")
-
-            prompt = f"""
-            You are an AI scheduling assistant. Rank these interview slots from best to worst for a {request.duration_minutes}-minute interview.
-
-            Candidate: {request.candidate_name}
-            Participants: {', '.join(request.participant_emails)}
-            Requirements: {request.specific_requirements or 'Standard interview'}
-
-            Available Slots:
-            {slots_info}
-
-            Consider these factors for ranking:
-            1. Time of day (late morning/early afternoon is usually best)
-            2. Day of week (mid-week is often preferred)
-            3. Participant availability
-            4. General interview best practices
-
-            Return only the indices of the top 5 slots in order of preference, as a comma-separated list.
-            For example: "2,0,4,1,3"
-            """
-
-            print("DEBUG: Sending prompt to Gemini API")
+            slots_info = _slots_block(slots, "%a %I:%M%p")
+
+            logger.debug("Prepared slots info: %d slots", min(len(slots), 10))
+
+            prompt = RANKING_PROMPT.format(
+                duration_minutes=request.duration_minutes,
+                candidate_name=request.candidate_name,
+                participants=', '.join(request.participant_emails),
+                requirements=request.specific_requirements or 'Standard interview',
+                slots_info=slots_info,
+            )
+
+            logger.debug("Sending prompt to Gemini API")
             try:
-                response = model.generate_content(prompt, generation_config=genai.GenerationConfig(temperature=0.3))
-                print("DEBUG: Received response from Gemini API")
+                response = await call_gemini(
+                    model.generate_content_async,
+                    prompt,
+                    generation_config=_get_ranking_config(),
+                )
+                logger.debug("Received response from Gemini API")
             except Exception as api_error:
-                print(f"DEBUG: Gemini API error in scheduling: {api_error}")
-                import traceback
-                print(f"DEBUG: API error traceback: {traceback.format_exc()}")
+                logger.warning("Gemini API error in scheduling: %s", api_error, exc_info=True)
                 return slots[:5]  # Fallback to first 5 slots without AI ranking
 
             if response and hasattr(response, 'text') and response.text:
-                print(f"DEBUG: AI response text: {response.text}")
+                logger.debug("AI response text: %s", response.text)
                 # Parse the AI response to get ranked indices
-                ranked_indices = [int(x.strip()) for x in response.text.split(',') if x.strip().isdigit()]
-                ranked_slots = []
-
-                for idx in ranked_indices[:5]:  # Take top 5
-                    if idx < len(slots):
-                        ranked_slots.append(slots[idx])
-
-                # Add any remaining slots that weren't ranked
-                for slot in slots:
-                    if slot not in ranked_slots and len(ranked_slots) < 5:
-                        ranked_slots.append(slot)
-
-                print(f"DEBUG: Ranked {len(ranked_slots)} slots")
+                ranked_indices = [int(x) for x in _INDEX_RE.findall(response.text)]
+                ranked_slots = self._apply_ranking(slots, ranked_indices)
+                self._ranking_cache[cache_key] = [slot.start_time for slot in ranked_slots]
+                logger.debug("Ranked %d slots", len(ranked_slots))
                 return ranked_slots
             else:
-                print("DEBUG: No response or text from Gemini API")
+                logger.warning("No response or text from Gemini API")
 
             return slots[:5]  # Fallback to first 5 slots
 
-        except Exception as e:
-            print(f"DEBUG: Error ranking suggestions with AI: {e}")
-            import traceback
-            print(f"DEBUG: AI ranking error traceback: {traceback.format_exc()}")
+        except Exception:
+            logger.exception("Error ranking suggestions with AI")
             return slots[:5]  # Fallback to first 5 slots
     
-    def _generate_confirmation_email(self, slot: InterviewSlot) -> str:
+    @staticmethod
+    def _ranking_cache_key(request: SchedulingRequest, slots: List[InterviewSlot]) -> str:
+        """
+        Key a ranking by what the prompt depends on: the request details and the
+        week being scheduled, rather than the shuffled order of the slots.
+        """
+        week_start = min(slot.start_time for slot in slots).date() if slots else None
+        key = (
+            request.candidate_name,
+            sorted(email.lower() for email in request.participant_emails),
+            request.duration_minutes,
+            request.specific_requirements,
+            week_start,
+            len(slots),
+        )
+        return hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+
+    @staticmethod
+    def _apply_ranking(slots: List[InterviewSlot], ranked_indices: List[int]) -> List[InterviewSlot]:
+        """
+        Take up to five slots in the ranked order, topped up with unranked slots.
+        """
+        ranked_slots = []
+
+        for idx in ranked_indices[:5]:  # Take top 5
+            if idx < len(slots):
+                ranked_slots.append(slots[idx])
+
+        # Add any remaining slots that weren't ranked. Tracked by identity:
+        # comparing models with == walks every field, including participants.
+        seen = {id(slot) for slot in ranked_slots}
+        for slot in slots:
+            if len(ranked_slots) >= 5:
+                break
+            if id(slot) not in seen:
+                ranked_slots.append(slot)
+                seen.add(id(slot))
+
+        return ranked_slots
+
+    async def _rank_and_draft_email(self, request: SchedulingRequest, slots: List[InterviewSlot]) -> List[InterviewSlot]:
+        """
+        Rank the slots and draft the candidate's confirmation email for the
+        top-ranked one in a single Gemini call, saving a round trip when the
+        interview is booked straight away. The draft is kept for
+        _generate_confirmation_email.
+        """
+        try:
+            model = _get_scheduling_model()
+
+            # The email needs the full date of the top slot, not just the weekday
+            slots_info = _slots_block(slots, "%a %B %d, %Y %I:%M%p")
+
+            # The booked slot gets the requested participants that are known to the scheduler
+            interview_team = [
+                participant.name
+                for participant in map(self.get_participant_by_email, request.participant_emails)
+                if participant
+            ]
+
+            prompt = RANK_AND_EMAIL_PROMPT.format(
+                duration_minutes=request.duration_minutes,
+                candidate_name=request.candidate_name,
+                participants=', '.join(request.participant_emails),
+                requirements=request.specific_requirements or 'Standard interview',
+                slots_info=slots_info,
+                interview_team=', '.join(interview_team),
+            )
+
+            response = await call_gemini(
+                model.generate_content_async,
+                prompt,
+                generation_config=_get_rank_and_email_config(),
+            )
+            if not response or not response.text:
+                logger.warning("No response or text from Gemini API")
+                return slots[:5]
+
+            result = orjson.loads(response.text)
+            ranked_slots = self._apply_ranking(slots, result.get("top_indices", []))
+            if ranked_slots and result.get("email_text"):
+                self._email_drafts[ranked_slots[0].id] = result["email_text"]
+            return ranked_slots
+
+        except Exception:
+            logger.exception("Error ranking suggestions with AI")
+            return slots[:5]  # Fallback to first 5 slots
+
+    async def _generate_confirmation_email(self, slot: InterviewSlot) -> str:
         """
         Generate a confirmation email for the booked interview slot using AI.
+        A draft written together with the slot ranking is used when there is one.
         """
+        draft = self._email_drafts.pop(slot.id, None)
+        if draft is not None:
+            return draft.replace(MEETING_LINK_PLACEHOLDER, slot.meeting_link or "")
+
         if not self.api_key:
             return "Email generation is not available. API key is not configured."
 
         try:
-            model = genai.GenerativeModel('gemini-2.5-flash')
+            model = _get_scheduling_model()
             
-            prompt = f"""
-            You are an AI assistant for Aegis Hire. Write a professional and friendly confirmation email to an interview candidate.
-
-            **Interview Details:**
-            - **Candidate Name:** {slot.booked_for}
-            - **Date and Time:** {slot.start_time.strftime('%A, %B %d, %Y at %I:%M %p')}
-            - **Duration:** {slot.duration_minutes} minutes
-            - **Interview Team:** {', '.join([p.name for p in slot.participants])}
-            - **Meeting Link:** {slot.meeting_link}
-
-            **Instructions:**
-            1.  Start with a warm and professional greeting.
-            2.  Confirm the interview details clearly.
-            3.  Provide instructions for joining the virtual meeting.
-            4.  End with a positive and encouraging closing.
-            5.  The email should be ready to be sent directly to the candidate.
-            6.  **IMPORTANT**: The output must be plain text only. Do not use any Markdown formatting (like **, *, etc.).
-
-            Generate the plain text email content now.
-            """
-
-            response = model.generate_content(prompt, generation_config=genai.GenerationConfig(temperature=0.5))
+            prompt = CONFIRMATION_EMAIL_PROMPT.format(
+                candidate_name=slot.booked_for,
+                start_time=slot.start_time.strftime('%A, %B %d, %Y at %I:%M %p'),
+                duration_minutes=slot.duration_minutes,
+                interview_team=', '.join([p.name for p in slot.participants]),
+                meeting_link=slot.meeting_link,
+            )
+
+            response = await call_gemini(
+                model.generate_content_async,
+                prompt,
+                generation_config=_get_email_config(),
+            )
             
             if response and hasattr(response, 'text') and response.text:
                 return response.text
             else:
                 return "Failed to generate email content."
-        except Exception as e:
-            print(f"Error generating confirmation email: {e}")
+        except Exception:
+            logger.exception("Error generating confirmation email")
             return "An error occurred while generating the email content."
 
     def book_interview_slot(self, slot_id: str, candidate_name: str, participant_emails: List[str]) -> Optional[InterviewSlot]:
         """
         Book an interview slot for a candidate with specified participants.
         """
-        if slot_id not in self.slots:
+        slot = self.slots.get(slot_id)
+        if slot is None:
             return None
-        
-        slot = self.slots[slot_id]
         if not slot.available:
             return None  # Slot already booked
         
         # Get participants
-        participants = []
-        for email in participant_emails:
-            participant = self.get_participant_by_email(email)
-            if participant:
-                participants.append(participant)
+        participants = [
+            participant
+            for participant in (self._email_index.get(email.lower()) for email in participant_emails)
+            if participant
+        ]
         
         # Book the slot
         slot.available = False
+        self._available_ids.discard(slot.id)
         slot.booked_for = candidate_name
         slot.participants = participants
         
@@ -441,12 +773,13 @@ class InterviewScheduler:
         """
         Cancel an interview booking.
         """
-        if slot_id not in self.slots:
+        slot = self.slots.get(slot_id)
+        if slot is None:
             return False
         
-        slot = self.slots[slot_id]
         if not slot.available:
             slot.available = True
+            self._available_ids.add(slot.id)
             slot.booked_by = None
             slot.booked_for = None
             slot.participants = []
@@ -456,13 +789,13 @@ class InterviewScheduler:
         
         return False
     
-    def schedule_interview(self, request: SchedulingRequest) -> SchedulingResponse:
+    async def schedule_interview(self, request: SchedulingRequest) -> SchedulingResponse:
         """
         Complete interview scheduling workflow - find available slots and book the best one.
         """
         try:
             # Generate suggestions
-            suggestions_response = self.generate_scheduling_suggestions(request)
+            suggestions_response = await self.generate_scheduling_suggestions(request, draft_email=True)
             
             if not suggestions_response.success or not suggestions_response.suggested_slots:
                 return suggestions_response
@@ -476,11 +809,18 @@ class InterviewScheduler:
             )
             
             if booked_slot:
+                # Only the email drafted with the ranking is included; it costs no extra call
+                email_content = (
+                    await self._generate_confirmation_email(booked_slot)
+                    if booked_slot.id in self._email_drafts
+                    else None
+                )
                 return SchedulingResponse(
                     success=True,
                     message=f"Successfully scheduled interview for {request.candidate_name} on {booked_slot.start_time.strftime('%A, %B %d at %I:%M %p')}",
                     booked_slot=booked_slot,
-                    calendar_invitations_sent=True  # In real implementation, this would be based on actual calendar API calls
+                    calendar_invitations_sent=True,  # In real implementation, this would be based on actual calendar API calls
+                    email_content=email_content
                 )
             else:
                 return SchedulingResponse(
@@ -584,18 +584,26 @@ const LiveInterviewModerator = () => {
   // --- Refs for managing WebSocket and SpeechRecognition ---
   const ws = useRef<WebSocket | null>(null);
   const recognition = useRef<SpeechRecognition | null>(null);
+  // Numbers each transcript chunk, so the server can drop resent chunks
+  const chunkSeq = useRef(0);
 
   const handleNudge = (nudgeData: string) => {
     try {
-      const data = JSON.parse(nudgeData);
-      if (data.event_type === "automatic_scribe") {
+      // The server sends all nudges for a transcript chunk as one JSON array
+      const parsed = JSON.parse(nudgeData);
+      const events = Array.isArray(parsed) ? parsed : [parsed];
+      const nudgeMessages = events
+        .filter((data) => data.event_type !== "automatic_scribe")
+        .map((data) => {
+          console.log("Received nudge:", data);
+          return `${data.event_type.replace(/_/g, " ").toUpperCase()}: ${
+            data.message
+          }`;
+        });
+      if (nudgeMessages.length === 0) {
         return;
       }
-      console.log("Received nudge:", data);
-      const nudgeMessage = `${data.event_type.replace(/_/g, " ").toUpperCase()}: ${
-        data.message
-      }`;
-      setNudges((prev) => [...prev, nudgeMessage]);
+      setNudges((prev) => [...prev, ...nudgeMessages]);
     } catch (e) {
       console.error("Failed to parse incoming nudge:", nudgeData);
     }
@@ -612,11 +620,16 @@ const LiveInterviewModerator = () => {
     setTranscript("");
     setNudges([]);
     setError(null);
+    chunkSeq.current = 0;
 
     const sessionId = "session_demo_" + Math.random().toString(36).substr(2, 9);
     ws.current = new WebSocket(`ws://127.0.0.1:8000/ws/interview/${sessionId}`);
 
-    ws.current.onopen = () => console.log("WebSocket connection established.");
+    ws.current.onopen = () => {
+      console.log("WebSocket connection established.");
+      // The first frame gives the server the job description for the whole session
+      ws.current?.send(JSON.stringify({ job_description: jobDescription }));
+    };
     ws.current.onclose = () => console.log("WebSocket connection closed.");
     ws.current.onerror = (err) => {
       console.error("WebSocket error:", err);
@@ -675,7 +688,9 @@ const LiveInterviewModerator = () => {
         if (final_transcript) {
           setTranscript((prev) => prev + final_transcript);
           if (ws.current?.readyState === WebSocket.OPEN) {
-            ws.current.send(final_transcript);
+            ws.current.send(
+              JSON.stringify({ seq: chunkSeq.current++, text: final_transcript }),
+            );
           }
         }
       };
@@ -20,11 +20,6 @@ type ScreeningResult = {
   [key: string]: unknown;
 };
 
-type JobDescriptionResponse = {
-  job_description: string;
-  error?: string;
-};
-
 type ParseResumeResponse = {
   parsed_resume: ParsedResume;
   error?: string;
@@ -186,7 +181,7 @@ export default function Home() {
 
     try {
       const response = await fetch(
-        `${BACKEND_INFO.baseUrl}/api/generate-job-description`,
+        `${BACKEND_INFO.baseUrl}/api/generate-job-description/stream`,
         {
           method: "POST",
           headers: {
@@ -196,18 +191,31 @@ export default function Home() {
         },
       );
 
-      if (!response.ok) {
+      if (!response.ok || !response.body) {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
 
-      const data: JobDescriptionResponse = await response.json();
-
-      if (data.error) {
-        throw new Error(data.error);
+      // Render the markdown as it streams in
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let description = "";
+      for (;;) {
+        const { done, value } = await reader.read();
+        if (done) {
+          break;
+        }
+        description += decoder.decode(value, { stream: true });
+        setJobDescription(description);
       }
+      description += decoder.decode();
 
-      setJobDescription(data.job_description);
+      if (!description.trim()) {
+        throw new Error("Empty job description");
+      }
+      setJobDescription(description);
     } catch (caughtError: unknown) {
+      // A stream that fails part-way leaves a truncated description behind
+      setJobDescription("");
       setError(
         buildErrorMessage(caughtError, "Failed to generate job description"),
       );
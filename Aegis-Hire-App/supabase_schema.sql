@@ -46,18 +46,49 @@ CREATE TABLE IF NOT EXISTS screening_results (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Create job_descriptions table to persist generated job descriptions
+CREATE TABLE IF NOT EXISTS job_descriptions (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    company TEXT NOT NULL,
+    department TEXT NOT NULL,
+    location TEXT NOT NULL,
+    employment_type TEXT NOT NULL,
+    salary_range TEXT NOT NULL,
+    overview TEXT NOT NULL,
+    responsibilities JSONB NOT NULL,
+    requirements JSONB NOT NULL,
+    preferred_qualifications JSONB NOT NULL,
+    benefits JSONB NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Create interview_guides table to persist generated interview guides
+CREATE TABLE IF NOT EXISTS interview_guides (
+    id TEXT PRIMARY KEY,
+    job_title TEXT NOT NULL,
+    candidate_name TEXT NOT NULL,
+    key_objectives JSONB NOT NULL,
+    structured_questions JSONB NOT NULL,
+    legal_guardrails JSONB NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
 -- Create indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_resumes_file_name ON resumes(file_name);
 CREATE INDEX IF NOT EXISTS idx_resumes_created_at ON resumes(created_at);
 CREATE INDEX IF NOT EXISTS idx_resume_sessions_created_at ON resume_sessions(created_at);
 CREATE INDEX IF NOT EXISTS idx_screening_results_session_id ON screening_results(session_id);
 CREATE INDEX IF NOT EXISTS idx_screening_results_rank ON screening_results(rank);
+CREATE INDEX IF NOT EXISTS idx_job_descriptions_created_at ON job_descriptions(created_at);
 
 -- Enable Row Level Security (RLS)
 ALTER TABLE resumes ENABLE ROW LEVEL SECURITY;
 ALTER TABLE resume_sessions ENABLE ROW LEVEL SECURITY;
 ALTER TABLE session_resumes ENABLE ROW LEVEL SECURITY;
 ALTER TABLE screening_results ENABLE ROW LEVEL SECURITY;
+ALTER TABLE job_descriptions ENABLE ROW LEVEL SECURITY;
+ALTER TABLE interview_guides ENABLE ROW LEVEL SECURITY;
 
 -- Create policies (you may want to adjust these based on your auth strategy)
 -- For now, allow all operations (remove this in production)
@@ -65,6 +96,8 @@ CREATE POLICY "Enable all operations for resumes" ON resumes FOR ALL USING (true
 CREATE POLICY "Enable all operations for resume_sessions" ON resume_sessions FOR ALL USING (true);
 CREATE POLICY "Enable all operations for session_resumes" ON session_resumes FOR ALL USING (true);
 CREATE POLICY "Enable all operations for screening_results" ON screening_results FOR ALL USING (true);
+CREATE POLICY "Enable all operations for job_descriptions" ON job_descriptions FOR ALL USING (true);
+CREATE POLICY "Enable all operations for interview_guides" ON interview_guides FOR ALL USING (true);
 
 -- Create updated_at trigger function
 CREATE OR REPLACE FUNCTION update_updated_at_column()